@@ -0,0 +1,31 @@
+"""Add unique (job_id, page_number) constraint to job_page_images
+
+Revision ID: b2c3d4e5f6a7
+Revises: a1b2c3d4e5f6
+Create Date: 2025-01-02 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b2c3d4e5f6a7'
+down_revision: Union[str, None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Re-runs of a job could insert its page rows again; keep the first row of each page
+    # so the constraint can be created.
+    op.execute(
+        "DELETE FROM job_page_images WHERE id NOT IN "
+        "(SELECT MIN(id) FROM job_page_images GROUP BY job_id, page_number)"
+    )
+    op.create_unique_constraint('uq_job_page_image_job_page', 'job_page_images', ['job_id', 'page_number'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_job_page_image_job_page', 'job_page_images', type_='unique')
@@ -1,6 +1,7 @@
 from celery import Celery
+from celery.signals import worker_process_shutdown
 
-from .config import get_celery_config
+from .config import _stop_log_listener, get_celery_config
 
 _celery_config = get_celery_config()
 
@@ -12,12 +13,21 @@ celery_app = Celery(
 )
 
 celery_app.conf.update(
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
+    task_serializer='msgpack',
+    accept_content=['msgpack', 'json'],
+    result_serializer='msgpack',
     timezone='UTC',
     enable_utc=True,
+    worker_concurrency=_celery_config["worker_concurrency"],
+    # Tasks run for minutes (VLM calls, latexmk); reserving extra messages per process would
+    # park queued jobs behind a slow one while other processes sit idle.
+    worker_prefetch_multiplier=1,
 )
 
+@worker_process_shutdown.connect
+def _flush_logs_on_worker_process_shutdown(**kwargs):
+    """Writes out log records still queued when a pool process exits (atexit never runs there)."""
+    _stop_log_listener()
+
 if __name__ == '__main__':
     celery_app.start()
@@ -3,7 +3,10 @@ Centralized configuration and logging setup for the API.
 """
 
 import os
+import queue
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from functools import lru_cache
 from dotenv import load_dotenv
 
@@ -24,16 +27,41 @@ def load_env() -> None:
 
 load_env()
 
+# Request handlers and tasks only enqueue records; one listener thread per process does the stream I/O.
+_log_queue_handler = QueueHandler(queue.SimpleQueue())
+_log_listener: QueueListener | None = None
+
+def _start_log_listener() -> None:
+    """Starts the background thread that writes queued log records to stderr."""
+    global _log_listener
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    _log_listener = QueueListener(_log_queue_handler.queue, handler)
+    _log_listener.start()
+
+def _restart_log_listener_after_fork() -> None:
+    """Forked children (Celery prefork workers) inherit no listener thread, so start a fresh one."""
+    _log_queue_handler.queue = queue.SimpleQueue()
+    _start_log_listener()
+
+def _stop_log_listener() -> None:
+    """Flushes queued records; safe to call more than once."""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+_start_log_listener()
+os.register_at_fork(after_in_child=_restart_log_listener_after_fork)
+# Celery prefork children leave through os._exit, which skips atexit; celery_app stops
+# the listener from worker_process_shutdown for them.
+atexit.register(_stop_log_listener)
+
 def get_logger(name: str) -> logging.Logger:
     """Get a configured logger instance."""
     logger = logging.getLogger(name)
     if not logger.handlers:
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        logger.addHandler(_log_queue_handler)
         logger.setLevel(logging.INFO)
     return logger
 
@@ -45,12 +73,23 @@ def get_database_url() -> str:
         raise ValueError("DATABASE_URL environment variable not set.")
     return url
 
+@lru_cache()
+def get_db_pool_config() -> dict:
+    """Get SQLAlchemy connection pool settings from environment."""
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "20")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "40")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "300")),
+        "pool_pre_ping": True,
+    }
+
 @lru_cache()
 def get_s3_config() -> dict:
     """Get S3 configuration from environment."""
     return {
         "bucket_name": os.getenv("S3_BUCKET_NAME"),
         "region": os.getenv("AWS_REGION"),
+        "use_crt": os.getenv("S3_USE_CRT") == "1",
     }
 
 @lru_cache()
@@ -59,8 +98,14 @@ def get_celery_config() -> dict:
     return {
         "broker_url": os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"),
         "result_backend": os.getenv("CELERY_RESULT_BACKEND_URL", "redis://localhost:6379/0"),
+        "worker_concurrency": int(os.getenv("CELERY_WORKER_CONCURRENCY", "2")),
     }
 
+@lru_cache()
+def get_raiseload_enabled() -> bool:
+    """Whether routers add raiseload('*') to ORM queries (enable in dev/test/CI)."""
+    return os.getenv("RAISELOAD_ENABLED", "0").lower() in ("1", "true", "yes")
+
 @lru_cache()
 def get_cors_origins() -> list:
     """Get CORS allowed origins."""
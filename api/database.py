@@ -1,16 +1,24 @@
+import os
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from .config import get_database_url
+from .config import get_database_url, get_db_pool_config
 
 SQLALCHEMY_DATABASE_URL = get_database_url()
 
+connect_args = {}
+if SQLALCHEMY_DATABASE_URL.startswith("postgresql"):
+    connect_args = {"application_name": "backend_api"}
+    # Short OLTP queries never benefit from JIT; opt-in because transaction poolers reject startup options.
+    if os.getenv("DB_DISABLE_JIT") == "1":
+        connect_args["options"] = "-c jit=off"
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    pool_size=5,
-    max_overflow=10,
-    pool_recycle=300,
+    connect_args=connect_args,
+    **get_db_pool_config(),
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
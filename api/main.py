@@ -20,12 +20,16 @@ app = FastAPI(title="Handwritten LaTeX Converter API")
 origins = get_cors_origins()
 logger.info(f"CORS allowed origins: {origins}")
 
+# Browsers cap preflight caching (Chromium at 2h); a long max_age saves an OPTIONS round-trip per call.
+CORS_PREFLIGHT_MAX_AGE = 7200
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization"],
+    max_age=CORS_PREFLIGHT_MAX_AGE,
 )
 
 @app.get("/")
@@ -37,5 +41,19 @@ async def health():
     """Health check endpoint for keep-warm pings."""
     return {"status": "ok"}
 
+@app.get("/metrics")
+async def metrics():
+    """Connection pool saturation for the API's database engine."""
+    pool = engine.pool
+    return {
+        "db_pool": {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checked_in": pool.checkedin(),
+            "status": pool.status(),
+        }
+    }
+
 app.include_router(upload.router)
 app.include_router(jobs.router)
@@ -3,7 +3,7 @@ from sqlalchemy import Column, String, DateTime, Enum as SQLEnum, ForeignKey, In
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.schema import Index
+from sqlalchemy.schema import Index, UniqueConstraint
 import uuid
 
 # Change to absolute import
@@ -29,6 +29,7 @@ class Job(Base):
     initial_tex_s3_path = Column(String, nullable=True)
     final_tex_s3_path = Column(String, nullable=True)
     final_pdf_s3_path = Column(String, nullable=True)
+    final_pdf_etag = Column(String, nullable=True)
     model_used = Column(String, nullable=True)
     status = Column(SQLEnum(JobStatus), default=JobStatus.PENDING, index=True)
     error_message = Column(String, nullable=True)
@@ -50,6 +51,7 @@ class JobPageImage(Base):
     s3_path = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     job = relationship("Job", back_populates="page_images")
+    __table_args__ = (UniqueConstraint('job_id', 'page_number', name='uq_job_page_image_job_page'),)
 
     def __repr__(self):
         return f"<JobPageImage(job_id={self.job_id}, page={self.page_number}, path='{self.s3_path}')>"
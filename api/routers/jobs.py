@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from fastapi.responses import StreamingResponse, Response
+from fastapi import APIRouter, Depends, HTTPException, Body, Header
+from fastapi.responses import RedirectResponse, StreamingResponse, Response
 import io
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session, defer, joinedload, load_only, raiseload
 import uuid
 from typing import List
 from fastapi import status
@@ -11,10 +12,10 @@ import re
 
 from .. import models, schemas
 from ..database import get_db
-from ..s3_utils import download_from_s3_async, get_s3_presigned_url, upload_content_to_s3_async
+from ..s3_utils import download_from_s3_async, stream_from_s3_async, get_s3_presigned_url, get_presigned_urls_for_job, upload_content_to_s3_async
 from ..celery_utils import get_celery
-from ..tasks import compile_final_document, compile_latex_preview, compile_latex_preview_with_images
-from ..config import get_logger
+from ..tasks import compile_final_document, compile_latex_preview, compile_latex_preview_with_images, segmentation_task_sort_key
+from ..config import get_logger, get_raiseload_enabled
 from ..services.image_enhancer import enhance_image
 
 logger = get_logger(__name__)
@@ -24,9 +25,40 @@ router = APIRouter(
     tags=["Jobs"],
 )
 
+# The final PDF is overwritten in place on recompile, so clients must revalidate its ETag on every use.
+PDF_CACHE_CONTROL = "private, no-cache"
+# A stored redirect would outlive its presigned URL's signature; never let clients keep one.
+REDIRECT_CACHE_CONTROL = "no-store"
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """True if an If-None-Match header value names the given (unquoted) entity tag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/").strip('"') for tag in if_none_match.split(","))
+    return etag in candidates
+
+def _download_base_filename(input_pdf_filename: str | None, job_id: uuid.UUID) -> str:
+    """Stem used to name TeX/PDF downloads: the uploaded filename without its .pdf suffix."""
+    if not input_pdf_filename:
+        return str(job_id)
+    return input_pdf_filename.removesuffix('.pdf')
+
+def _job_exists(db: Session, job_id: uuid.UUID) -> bool:
+    """SELECT EXISTS(...) check for endpoints that only need to 404 on unknown jobs."""
+    return db.query(db.query(models.Job.id).filter(models.Job.id == job_id).exists()).scalar()
+
+def _loader_options(*eager):
+    """Query options for ORM loads: the given eager options, plus raiseload('*') when
+    RAISELOAD_ENABLED is set so an accidental lazy load fails loudly in dev/test."""
+    if get_raiseload_enabled():
+        return (*eager, raiseload("*"))
+    return eager
+
 @router.get("/{job_id}/status", response_model=schemas.JobStatusResponse)
-async def get_job_status(job_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
+def get_job_status(job_id: uuid.UUID, db: Session = Depends(get_db)):
+    db_job = db.query(models.Job.id, models.Job.status, models.Job.error_message).filter(models.Job.id == job_id).first()
     if db_job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     return schemas.JobStatusResponse(
@@ -36,18 +68,21 @@ async def get_job_status(job_id: uuid.UUID, db: Session = Depends(get_db)):
     )
 
 @router.get("", response_model=List[schemas.Job])
-async def list_jobs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def list_jobs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     try:
-        jobs = db.query(models.Job).order_by(models.Job.created_at.desc()).offset(skip).limit(limit).all()
+        jobs = db.query(models.Job).options(*_loader_options(defer(models.Job.segmentation_tasks))).order_by(models.Job.created_at.desc()).offset(skip).limit(limit).all()
         logger.debug(f"Retrieved {len(jobs)} jobs")
-        return jobs
+        validated = schemas.JobListAdapter.validate_python(jobs, from_attributes=True)
+        return Response(content=schemas.JobListAdapter.dump_json(validated), media_type="application/json")
     except Exception as e:
         logger.exception(f"Error in list_jobs: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/{job_id}/tex")
-async def get_job_tex(job_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
+async def get_job_tex(job_id: uuid.UUID, redirect: bool = False, db: Session = Depends(get_db)):
+    db_job = db.query(
+        models.Job.status, models.Job.final_tex_s3_path, models.Job.initial_tex_s3_path, models.Job.input_pdf_filename
+    ).filter(models.Job.id == job_id).first()
     if db_job is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
 
@@ -81,23 +116,36 @@ async def get_job_tex(job_id: uuid.UUID, db: Session = Depends(get_db)):
             detail=f"TeX file not available for current job status: '{db_job.status.value}'"
         )
 
+    base_filename = _download_base_filename(db_job.input_pdf_filename, job_id)
+    download_filename = f"{base_filename}_{file_description.lower().replace(' ', '_')}.tex"
+
+    if redirect:
+        presigned_url = get_s3_presigned_url(
+            tex_s3_path,
+            response_content_disposition=f"attachment; filename=\"{download_filename}\"",
+            response_content_type="text/plain",
+            cache=False,  # TeX files are overwritten in place and carry no version to key on.
+        )
+        if presigned_url:
+            logger.info(f"Redirecting to {file_description} for job {job_id}")
+            return RedirectResponse(presigned_url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
     logger.info(f"Serving {file_description} for job {job_id}")
-    tex_content_bytes = await download_from_s3_async(tex_s3_path)
-    if tex_content_bytes is None:
+    tex_chunks = await stream_from_s3_async(tex_s3_path)
+    if tex_chunks is None:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to retrieve {file_description} file from S3.")
 
-    base_filename = db_job.input_pdf_filename.replace('.pdf', '') if db_job.input_pdf_filename else str(job_id)
-    download_filename = f"{base_filename}_{file_description.lower().replace(' ', '_')}.tex"
-
     return StreamingResponse(
-        io.BytesIO(tex_content_bytes),
+        tex_chunks,
         media_type="text/plain",
         headers={"Content-Disposition": f"attachment; filename=\"{download_filename}\""}
     )
 
 @router.get("/{job_id}/pdf")
-async def get_job_pdf(job_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
+async def get_job_pdf(job_id: uuid.UUID, if_none_match: str | None = Header(default=None), db: Session = Depends(get_db)):
+    db_job = db.query(
+        models.Job.status, models.Job.final_pdf_s3_path, models.Job.final_pdf_etag, models.Job.input_pdf_filename
+    ).filter(models.Job.id == job_id).first()
     if db_job is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
 
@@ -110,24 +158,45 @@ async def get_job_pdf(job_id: uuid.UUID, db: Session = Depends(get_db)):
     if not db_job.final_pdf_s3_path:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Final PDF file path not found for this completed job.")
 
+    base_filename = _download_base_filename(db_job.input_pdf_filename, job_id)
+    download_filename = f"{base_filename}_final.pdf"
+
+    presigned_url = get_s3_presigned_url(
+        db_job.final_pdf_s3_path,
+        response_content_disposition=f"inline; filename=\"{download_filename}\"",
+        response_content_type="application/pdf",
+        cache=db_job.final_pdf_etag is not None,
+        version=db_job.final_pdf_etag,
+    )
+    if presigned_url:
+        logger.info(f"Redirecting to Final PDF for job {job_id}")
+        return RedirectResponse(
+            presigned_url, status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+            headers={"Cache-Control": REDIRECT_CACHE_CONTROL},
+        )
+
+    # Validators only go on responses whose body is the PDF itself, so a 304 can never
+    # make a client reuse an earlier redirect.
+    cache_headers = {}
+    if db_job.final_pdf_etag:
+        cache_headers = {"ETag": f"\"{db_job.final_pdf_etag}\"", "Cache-Control": PDF_CACHE_CONTROL}
+        if _etag_matches(if_none_match, db_job.final_pdf_etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
     logger.info(f"Serving Final PDF for job {job_id}")
-    pdf_content_bytes = await download_from_s3_async(db_job.final_pdf_s3_path)
-    if pdf_content_bytes is None:
+    pdf_chunks = await stream_from_s3_async(db_job.final_pdf_s3_path)
+    if pdf_chunks is None:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve final PDF file from S3.")
 
-    base_filename = db_job.input_pdf_filename.replace('.pdf', '') if db_job.input_pdf_filename else str(job_id)
-    download_filename = f"{base_filename}_final.pdf"
-
     return StreamingResponse(
-        io.BytesIO(pdf_content_bytes),
+        pdf_chunks,
         media_type="application/pdf",
-        headers={"Content-Disposition": f"inline; filename=\"{download_filename}\""}
+        headers={"Content-Disposition": f"inline; filename=\"{download_filename}\"", **cache_headers}
     )
 
 @router.get("/{job_id}/pages", response_model=schemas.JobPageImagesResponse)
 def get_page_images(job_id: uuid.UUID, db: Session = Depends(get_db)):
-    from sqlalchemy.orm import joinedload
-    job = db.query(models.Job).options(joinedload(models.Job.page_images)).filter(models.Job.id == job_id).first()
+    job = db.query(models.Job).options(*_loader_options(load_only(models.Job.id), joinedload(models.Job.page_images))).filter(models.Job.id == job_id).first()
     if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     if not job.page_images:
@@ -135,57 +204,58 @@ def get_page_images(job_id: uuid.UUID, db: Session = Depends(get_db)):
     page_image_infos = []
     try:
         sorted_pages = sorted(job.page_images, key=lambda p: p.page_number)
+        urls = get_presigned_urls_for_job(job.id, [p.s3_path for p in sorted_pages])
+        if urls is None:
+            raise HTTPException(status_code=500, detail="Could not generate page image URLs.")
         for page_image in sorted_pages:
-            url = get_s3_presigned_url(page_image.s3_path)
-            if not url:
-                raise HTTPException(status_code=500, detail=f"Could not generate URL for page {page_image.page_number}.")
-            page_image_infos.append(schemas.PageImageInfo(page_number=page_image.page_number, image_url=url))
+            page_image_infos.append(schemas.PageImageInfo(page_number=page_image.page_number, image_url=urls[page_image.s3_path]))
     except Exception as e:
         logger.exception(f"Error retrieving page images for job {job_id}: {e}")
         raise HTTPException(status_code=500, detail="Error retrieving page image information.")
-    return schemas.JobPageImagesResponse(job_id=job.id, pages=page_image_infos)
+    response = schemas.JobPageImagesResponse(job_id=job.id, pages=page_image_infos)
+    return Response(content=response.model_dump_json(), media_type="application/json")
 
 @router.get("/{job_id}/segmentations", response_model=List[schemas.Segmentation], tags=["Jobs", "Segmentations"])
-async def get_segmentations(job_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
-    if db_job is None:
+def get_segmentations(job_id: uuid.UUID, db: Session = Depends(get_db)):
+    if not _job_exists(db, job_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
 
-    segmentations = db.query(models.Segmentation).filter(models.Segmentation.job_id == job_id).all()
+    segmentations = db.query(models.Segmentation).options(*_loader_options()).filter(models.Segmentation.job_id == job_id).all()
 
     if not segmentations:
         return []
 
-    return segmentations
+    validated = schemas.SegmentationListAdapter.validate_python(segmentations, from_attributes=True)
+    return Response(content=schemas.SegmentationListAdapter.dump_json(validated, by_alias=True), media_type="application/json")
 
 @router.post("/{job_id}/segmentations", response_model=List[schemas.Segmentation], status_code=status.HTTP_201_CREATED, tags=["Jobs", "Segmentations"])
-async def create_segmentations(job_id: uuid.UUID, segmentations_in: List[schemas.SegmentationCreate], db: Session = Depends(get_db)):
-    db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
+def create_segmentations(job_id: uuid.UUID, segmentations_in: List[schemas.SegmentationCreate], db: Session = Depends(get_db)):
+    db_job = db.query(models.Job).options(*_loader_options(load_only(models.Job.id, models.Job.status))).filter(models.Job.id == job_id).first()
     if db_job is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
-    segmentation_objects = []
-    for seg_in in segmentations_in:
-        db_segmentation = models.Segmentation(job_id=job_id, **seg_in.model_dump())
-        segmentation_objects.append(db_segmentation)
-    if not segmentation_objects:
+    if not segmentations_in:
         db_job.status = models.JobStatus.SEGMENTATION_COMPLETE
         db.commit()
         return []
     try:
-        db.add_all(segmentation_objects)
+        # One INSERT ... RETURNING fills id/created_at for every row; serialize before
+        # commit so expiry doesn't trigger a per-row refresh SELECT.
+        result = db.execute(
+            insert(models.Segmentation).returning(models.Segmentation),
+            [{"job_id": job_id, **seg_in.model_dump()} for seg_in in segmentations_in],
+        )
+        created = schemas.SegmentationListAdapter.validate_python(result.scalars().all(), from_attributes=True)
         db_job.status = models.JobStatus.SEGMENTATION_COMPLETE
         db.commit()
-        for seg in segmentation_objects:
-            db.refresh(seg)
     except Exception as e:
         db.rollback()
         logger.exception(f"Failed to save segmentation data for job {job_id}: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to save segmentation data.")
-    return segmentation_objects
+    return created
 
 @router.get("/{job_id}/segmentation-tasks", response_model=schemas.SegmentationTaskListResponse, tags=["Jobs", "Segmentations"])
-async def get_segmentation_tasks(job_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
+def get_segmentation_tasks(job_id: uuid.UUID, db: Session = Depends(get_db)):
+    db_job = db.query(models.Job.segmentation_tasks).filter(models.Job.id == job_id).first()
     if db_job is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
     task_mapping = db_job.segmentation_tasks
@@ -194,39 +264,56 @@ async def get_segmentation_tasks(job_id: uuid.UUID, db: Session = Depends(get_db
     elif not isinstance(task_mapping, dict):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Invalid format for segmentation data.")
     else:
-        tasks_list = [schemas.SegmentationTaskItem(placeholder=name, description=desc) for name, desc in task_mapping.items()]
-        tasks_list.sort(key=lambda item: (item.placeholder.startswith('DIAGRAM'), item.placeholder))
+        # Mappings are stored in this order, so the sort is a single linear pass for new jobs.
+        tasks_list = [
+            schemas.SegmentationTaskItem(placeholder=name, description=desc)
+            for name, desc in sorted(task_mapping.items(), key=segmentation_task_sort_key)
+        ]
     return schemas.SegmentationTaskListResponse(job_id=job_id, tasks=tasks_list)
 
 @router.post("/{job_id}/compile", response_model=schemas.Job, tags=["Jobs", "Compilation"])
-async def trigger_final_compilation(
+def trigger_final_compilation(
     job_id: uuid.UUID,
     db: Session = Depends(get_db),
     celery_app: Celery = Depends(get_celery)
 ):
-    db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
-    if db_job is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+    # Conditional UPDATE ... RETURNING: one round-trip, and only one of several concurrent
+    # triggers can move the job to COMPILATION_PENDING and enqueue the task.
+    try:
+        result = db.execute(
+            update(models.Job)
+            .where(
+                models.Job.id == job_id,
+                models.Job.status.in_([models.JobStatus.AWAITING_SEGMENTATION, models.JobStatus.SEGMENTATION_COMPLETE]),
+            )
+            .values(status=models.JobStatus.COMPILATION_PENDING)
+            .returning(models.Job)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        db_job = result.scalars().first()
+        response = schemas.Job.model_validate(db_job, from_attributes=True) if db_job is not None else None
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"Failed to trigger final compilation for job {job_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to trigger final compilation.")
 
-    if db_job.status not in [models.JobStatus.AWAITING_SEGMENTATION, models.JobStatus.SEGMENTATION_COMPLETE]:
+    if response is None:
+        current = db.query(models.Job.status).filter(models.Job.id == job_id).first()
+        if current is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Job status is '{db_job.status.value}'. Final compilation can only be triggered when status is 'awaiting_segmentation' or 'segmentation_complete'."
+            detail=f"Job status is '{current.status.value}'. Final compilation can only be triggered when status is 'awaiting_segmentation' or 'segmentation_complete'."
         )
 
     try:
-        db_job.status = models.JobStatus.COMPILATION_PENDING
-        db.commit()
-        db.refresh(db_job)
-
-        compile_final_document.delay(str(db_job.id))
+        compile_final_document.delay(str(job_id))
         logger.info(f"Triggered final compilation for job {job_id}")
-
-        return db_job
     except Exception as e:
-        db.rollback()
         logger.exception(f"Failed to trigger final compilation for job {job_id}: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to trigger final compilation.")
+    return response
 
 @router.post("/{job_id}/preview", tags=["Jobs", "Preview"], 
              responses={
@@ -236,15 +323,14 @@ async def trigger_final_compilation(
                  500: {"description": "Internal server error"},
                  504: {"description": "Compilation timed out"}
              })
-async def generate_latex_preview(
+def generate_latex_preview(
     job_id: uuid.UUID,
     tex_content: str = Body(..., media_type="text/plain"), 
     db: Session = Depends(get_db)
 ):
     import base64
     
-    db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
-    if db_job is None:
+    if not _job_exists(db, job_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
 
     try:
@@ -284,15 +370,14 @@ async def generate_latex_preview(
                  500: {"description": "Internal server error"},
                  504: {"description": "Compilation timed out"}
              })
-async def generate_latex_preview_with_images(
+def generate_latex_preview_with_images(
     job_id: uuid.UUID,
     tex_content: str = Body(..., media_type="text/plain"), 
     db: Session = Depends(get_db)
 ):
     import base64
     
-    db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
-    if db_job is None:
+    if not _job_exists(db, job_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
 
     try:
@@ -330,7 +415,9 @@ async def update_job_tex(
     tex_content: str = Body(..., media_type="text/plain"),
     db: Session = Depends(get_db)
 ):
-    db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    db_job = db.query(models.Job).options(*_loader_options(load_only(
+        models.Job.id, models.Job.status, models.Job.final_tex_s3_path, models.Job.initial_tex_s3_path, models.Job.final_pdf_s3_path, models.Job.final_pdf_etag
+    ))).filter(models.Job.id == job_id).first()
     if db_job is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
     
@@ -376,6 +463,7 @@ async def update_job_tex(
         if is_final_tex:
             db_job.status = models.JobStatus.SEGMENTATION_COMPLETE
             db_job.final_pdf_s3_path = None
+            db_job.final_pdf_etag = None
             db.commit()
         
         logger.info(f"Updated TeX file for job {job_id}")
@@ -398,11 +486,11 @@ async def enhance_segmentation(
     db: Session = Depends(get_db)
 ):
     """Enhance a segmented image using AI to create a clean, professional version."""
-    db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    db_job = db.query(models.Job).options(*_loader_options(load_only(models.Job.id, models.Job.segmentation_tasks))).filter(models.Job.id == job_id).first()
     if db_job is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
     
-    segmentation = db.query(models.Segmentation).filter(
+    segmentation = db.query(models.Segmentation).options(*_loader_options()).filter(
         models.Segmentation.job_id == job_id,
         models.Segmentation.label == request.label
     ).first()
@@ -421,7 +509,7 @@ async def enhance_segmentation(
     seg_width = request.width if use_request_coords else segmentation.width
     seg_height = request.height if use_request_coords else segmentation.height
     
-    page_image = db.query(models.JobPageImage).filter(
+    page_image = db.query(models.JobPageImage).options(*_loader_options()).filter(
         models.JobPageImage.job_id == job_id,
         models.JobPageImage.page_number == page_number
     ).first()
@@ -471,7 +559,8 @@ async def enhance_segmentation(
         s3_key=original_s3_key,
         content_type='image/png'
     )
-    original_url = get_s3_presigned_url(original_s3_key)
+    # Both crops are overwritten in place on every enhance, so a cached URL could show the old image.
+    original_url = get_s3_presigned_url(original_s3_key, cache=False)
     
     enhanced_url = ""
     enhanced_s3_key = ""
@@ -487,7 +576,7 @@ async def enhance_segmentation(
         )
         
         if upload_result:
-            enhanced_url = get_s3_presigned_url(enhanced_s3_key) or ""
+            enhanced_url = get_s3_presigned_url(enhanced_s3_key, cache=False) or ""
             if segmentation:
                 segmentation.enhanced_s3_path = enhanced_s3_key
                 db.commit()
@@ -512,14 +601,14 @@ async def enhance_segmentation(
 
 
 @router.patch("/{job_id}/segmentations/{segmentation_id}/use-enhanced", tags=["Jobs", "Enhancement"])
-async def set_use_enhanced(
+def set_use_enhanced(
     job_id: uuid.UUID,
     segmentation_id: int,
     request: schemas.UseEnhancedRequest,
     db: Session = Depends(get_db)
 ):
     """Set whether to use the enhanced version of a segmentation."""
-    segmentation = db.query(models.Segmentation).filter(
+    segmentation = db.query(models.Segmentation).options(*_loader_options()).filter(
         models.Segmentation.id == segmentation_id,
         models.Segmentation.job_id == job_id
     ).first()
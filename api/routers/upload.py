@@ -12,6 +12,7 @@ from ..config import get_logger
 logger = get_logger(__name__)
 
 DEFAULT_CONVERSION_MODEL = "gpt-5.2"
+PDF_MAGIC = b"%PDF"
 
 router = APIRouter(
     prefix="/upload",
@@ -29,6 +30,10 @@ async def upload_pdf_and_start_job(
         raise HTTPException(status_code=400, detail="No filename provided")
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Invalid file type. Only PDF is allowed.")
+    # Reject mislabelled uploads from the header alone, before any bytes go to S3.
+    if await file.read(len(PDF_MAGIC)) != PDF_MAGIC:
+        raise HTTPException(status_code=400, detail="Invalid file content. Only PDF is allowed.")
+    await file.seek(0)
 
     s3_path = await upload_fileobj_to_s3_async(file.file, file.filename, file.content_type)
     if not s3_path:
@@ -2,30 +2,167 @@
 Utilities for interacting with AWS S3.
 """
 
+import os
 import uuid
 import io
+import gzip
+import zlib
+import hmac
+import time
+import hashlib
+import re
 import asyncio
+import threading
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 from functools import partial
+from typing import Iterator
+from urllib.parse import quote, urlsplit, parse_qsl
 from fastapi import UploadFile
 import boto3
-from botocore.exceptions import ClientError
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
 
 from .config import get_s3_config, get_logger
 
 _executor = ThreadPoolExecutor(max_workers=10)
 
+STREAM_CHUNK_SIZE = 1024 * 1024
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
+TRANSFER_PART_SIZE = 4 * 1024 * 1024
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=TRANSFER_PART_SIZE,
+    multipart_chunksize=TRANSFER_PART_SIZE,
+    max_concurrency=8,
+    use_threads=True,
+)
+# For one TransferManager shared by a batch of small single-part uploads (the page images).
+S3_BATCH_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=TRANSFER_PART_SIZE,
+    multipart_chunksize=TRANSFER_PART_SIZE,
+    max_concurrency=16,
+    use_threads=True,
+)
+
+COMPRESSIBLE_CONTENT_TYPES = ("application/json", "application/x-tex")
+GZIP_COMPRESS_LEVEL = 6
+
+PRESIGNED_BATCH_CACHE_MAXSIZE = 1024
+_presigned_batch_cache: "OrderedDict[str, tuple[float, tuple[str, ...], dict[str, str]]]" = OrderedDict()
+_presigned_batch_lock = threading.Lock()
+
+PRESIGNED_URL_CACHE_MAXSIZE = 4096
+_presigned_url_cache: "OrderedDict[tuple, tuple[float, str]]" = OrderedDict()
+_presigned_url_lock = threading.Lock()
+
 logger = get_logger(__name__)
 
+S3_MAX_ATTEMPTS = 3
+RETRYABLE_S3_ERROR_CODES = frozenset({
+    "500", "502", "503", "504", "InternalError", "RequestTimeout",
+    "ServiceUnavailable", "SlowDown", "Throttling", "ThrottlingException",
+})
+# Code in a ClientError message, e.g. "An error occurred (SlowDown) when calling ..."
+_CLIENT_ERROR_CODE_RE = re.compile(r"An error occurred \(([^)]+)\)")
+
 _s3_config = get_s3_config()
 S3_BUCKET_NAME = _s3_config["bucket_name"]
 AWS_REGION = _s3_config["region"]
+S3_USE_CRT = _s3_config["use_crt"]
+
+CRT_TARGET_THROUGHPUT_GBPS = 10
+CRT_PART_SIZE = 8 * 1024 * 1024
 
 if not S3_BUCKET_NAME:
     logger.warning("S3_BUCKET_NAME environment variable not set. Using placeholder.")
     S3_BUCKET_NAME = "your-handwriting-latex-bucket-placeholder"
 
-s3_client = boto3.client('s3')
+# Sized for the task fan-out (up to 32 concurrent uploads/downloads) plus the API executor;
+# botocore's default pool of 10 connections would otherwise serialize them.
+S3_MAX_POOL_CONNECTIONS = 64
+
+s3_client = boto3.client('s3', config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS))
+
+_crt_transfer_manager = None
+_crt_lock = threading.Lock()
+
+def _get_crt_transfer_manager():
+    """
+    Returns a shared CRT-backed transfer manager when S3_USE_CRT=1, else None.
+    Requires the optional awscrt package (pip install "botocore[crt]").
+    """
+    global _crt_transfer_manager, S3_USE_CRT
+    if not S3_USE_CRT:
+        return None
+
+    with _crt_lock:
+        if _crt_transfer_manager is None:
+            try:
+                import botocore.session
+                from s3transfer.crt import (
+                    BotocoreCRTCredentialsWrapper,
+                    BotocoreCRTRequestSerializer,
+                    CRTTransferManager,
+                    create_s3_crt_client,
+                )
+            except ImportError:
+                logger.warning("S3_USE_CRT=1 but awscrt is not installed. Falling back to boto3 transfers.")
+                S3_USE_CRT = False
+                return None
+
+            session = botocore.session.Session()
+            region = AWS_REGION or session.get_config_variable('region')
+            credentials_provider = BotocoreCRTCredentialsWrapper(
+                session.get_credentials()
+            ).to_crt_credentials_provider()
+            crt_s3_client = create_s3_crt_client(
+                region,
+                crt_credentials_provider=credentials_provider,
+                target_throughput=CRT_TARGET_THROUGHPUT_GBPS * 1_000_000_000 // 8,
+                part_size=CRT_PART_SIZE,
+            )
+            serializer = BotocoreCRTRequestSerializer(session, client_kwargs={'region_name': region})
+            _crt_transfer_manager = CRTTransferManager(crt_s3_client, serializer)
+            logger.info("Initialized CRT S3 transfer manager")
+
+    return _crt_transfer_manager
+
+def _is_transient_s3_error(error: Exception) -> bool:
+    """True for throttling, 5xx and network errors that are worth retrying."""
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code') in RETRYABLE_S3_ERROR_CODES
+    if isinstance(error, S3UploadFailedError):
+        # upload_file wraps every ClientError, permanent ones (AccessDenied, NoSuchBucket) included.
+        wrapped = error.__cause__ or error.__context__
+        if wrapped is not None:
+            return _is_transient_s3_error(wrapped)
+        match = _CLIENT_ERROR_CODE_RE.search(str(error))
+        return bool(match) and match.group(1) in RETRYABLE_S3_ERROR_CODES
+    return isinstance(error, (BotoConnectionError, HTTPClientError))
+
+def retry_s3_call(fn, *args, **kwargs):
+    """
+    Calls an S3 operation, retrying transient failures with exponential backoff
+    (1s, 2s, ...) up to S3_MAX_ATTEMPTS attempts. Other errors are raised immediately.
+    """
+    for attempt in range(S3_MAX_ATTEMPTS):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == S3_MAX_ATTEMPTS - 1 or not _is_transient_s3_error(e):
+                raise
+            delay = 2 ** attempt
+            logger.warning(f"Transient S3 error ({e}); retrying in {delay}s (attempt {attempt + 1}/{S3_MAX_ATTEMPTS})")
+            time.sleep(delay)
+
+def _is_compressible(content_type: str | None) -> bool:
+    """Check if a content type is textual and worth gzip-compressing."""
+    if not content_type:
+        return False
+    return content_type.startswith("text/") or content_type in COMPRESSIBLE_CONTENT_TYPES
 
 def _is_bucket_configured() -> bool:
     """Check if S3 bucket is properly configured."""
@@ -47,7 +184,8 @@ def upload_to_s3(file: UploadFile, filename: str) -> str | None:
             file.file, 
             S3_BUCKET_NAME, 
             unique_key,
-            ExtraArgs={'ContentType': file.content_type}
+            ExtraArgs={'ContentType': file.content_type},
+            Config=S3_TRANSFER_CONFIG
         )
         logger.info(f"Successfully uploaded {filename}")
         return unique_key
@@ -70,12 +208,20 @@ def upload_local_file_to_s3(local_file_path: str, s3_key: str, content_type: str
     logger.info(f"Uploading local file '{local_file_path}' to S3 key '{s3_key}'")
     
     try:
-        s3_client.upload_file(
-            Filename=local_file_path, 
-            Bucket=S3_BUCKET_NAME, 
-            Key=s3_key,
-            ExtraArgs=extra_args
-        )
+        crt_manager = _get_crt_transfer_manager()
+        if crt_manager is not None:
+            if not os.path.exists(local_file_path):
+                raise FileNotFoundError(local_file_path)
+            crt_manager.upload(local_file_path, S3_BUCKET_NAME, s3_key, extra_args=extra_args).result()
+        else:
+            retry_s3_call(
+                s3_client.upload_file,
+                Filename=local_file_path, 
+                Bucket=S3_BUCKET_NAME, 
+                Key=s3_key,
+                ExtraArgs=extra_args,
+                Config=S3_TRANSFER_CONFIG
+            )
         logger.info(f"Successfully uploaded {local_file_path}")
         return s3_key
     except FileNotFoundError:
@@ -96,9 +242,14 @@ def download_from_s3(s3_key: str) -> bytes | None:
     logger.info(f"Downloading key '{s3_key}' from S3")
     
     try:
-        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=s3_key)
-        with response['Body'] as body:
-            content = body.read()
+        def fetch():
+            response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=s3_key)
+            with response['Body'] as body:
+                return response, body.read()
+
+        response, content = retry_s3_call(fetch)
+        if response.get('ContentEncoding') == 'gzip':
+            content = gzip.decompress(content)
         logger.info(f"Successfully downloaded {s3_key}")
         return content
     except ClientError as e:
@@ -111,17 +262,138 @@ def download_from_s3(s3_key: str) -> bytes | None:
         logger.exception(f"Unexpected error during S3 download: {e}")
         return None
 
-def get_s3_presigned_url(s3_key: str, expiration_seconds: int = 3600) -> str | None:
-    """Generates a presigned URL for accessing an S3 object."""
+def _iter_body_chunks(response: dict, chunk_size: int) -> Iterator[bytes]:
+    """Yields an S3 response body chunk by chunk, gunzipping it if needed."""
+    decompressor = None
+    if response.get('ContentEncoding') == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    with response['Body'] as body:
+        for chunk in body.iter_chunks(chunk_size):
+            yield decompressor.decompress(chunk) if decompressor else chunk
+    if decompressor:
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+
+def stream_from_s3(s3_key: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes] | None:
+    """
+    Opens an object in the configured S3 bucket and returns an iterator over its content.
+    Only one chunk is held in memory at a time. Returns None if the object cannot be opened.
+    """
+    if not _is_bucket_configured():
+        return None
+    
+    logger.info(f"Streaming key '{s3_key}' from S3")
+    
+    try:
+        response = retry_s3_call(s3_client.get_object, Bucket=S3_BUCKET_NAME, Key=s3_key)
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'NoSuchKey':
+            logger.error(f"S3 key '{s3_key}' not found in bucket.")
+        else:
+            logger.error(f"S3 ClientError streaming {s3_key}: {e}")
+        return None
+    except Exception as e:
+        logger.exception(f"Unexpected error opening S3 stream: {e}")
+        return None
+    return _iter_body_chunks(response, chunk_size)
+
+def download_file_from_s3(s3_key: str, local_file_path: str) -> bool:
+    """Downloads an S3 object straight to a local file without buffering it in memory."""
+    if not _is_bucket_configured():
+        return False
+    
+    logger.info(f"Downloading key '{s3_key}' from S3 to '{local_file_path}'")
+    
+    try:
+        crt_manager = _get_crt_transfer_manager()
+        if crt_manager is not None:
+            crt_manager.download(S3_BUCKET_NAME, s3_key, local_file_path).result()
+        else:
+            retry_s3_call(s3_client.download_file, Bucket=S3_BUCKET_NAME, Key=s3_key, Filename=local_file_path, Config=S3_TRANSFER_CONFIG)
+        logger.info(f"Successfully downloaded {s3_key}")
+        return True
+    except ClientError as e:
+        logger.error(f"S3 ClientError downloading {s3_key}: {e}")
+        return False
+    except Exception as e:
+        logger.exception(f"Unexpected error during S3 download of {s3_key}: {e}")
+        return False
+
+def copy_s3_object(source_key: str, dest_key: str) -> str | None:
+    """Copies an object within the configured bucket server-side, keeping its metadata."""
+    if not _is_bucket_configured():
+        return None
+
+    logger.info(f"Copying S3 key '{source_key}' to '{dest_key}'")
+
+    try:
+        retry_s3_call(
+            s3_client.copy_object,
+            Bucket=S3_BUCKET_NAME,
+            Key=dest_key,
+            CopySource={'Bucket': S3_BUCKET_NAME, 'Key': source_key},
+        )
+        logger.info(f"Successfully copied {source_key} to {dest_key}")
+        return dest_key
+    except ClientError as e:
+        logger.error(f"S3 ClientError copying {source_key} to {dest_key}: {e}")
+        return None
+    except Exception as e:
+        logger.exception(f"Unexpected error during S3 copy of {source_key}: {e}")
+        return None
+
+def get_s3_presigned_url(s3_key: str, expiration_seconds: int = 3600,
+                         response_content_disposition: str | None = None,
+                         response_content_type: str | None = None,
+                         cache: bool = True, version: str | None = None) -> str | None:
+    """
+    Generates a presigned URL for accessing an S3 object. The optional response_*
+    arguments make S3 serve the object with those Content-Disposition/Content-Type headers.
+    A URL is reused for half its lifetime, so callers always get one valid for at least that long.
+    Objects overwritten in place must pass their content version (e.g. an ETag), or
+    cache=False when none is known, so a stale URL is never handed out after a rewrite.
+    """
     if not _is_bucket_configured():
         return None
+
+    if not cache:
+        return _generate_presigned_url(s3_key, expiration_seconds, response_content_disposition, response_content_type)
+
+    cache_key = (S3_BUCKET_NAME, s3_key, expiration_seconds, response_content_disposition, response_content_type, version)
+    now = time.monotonic()
+    with _presigned_url_lock:
+        entry = _presigned_url_cache.get(cache_key)
+        if entry and entry[0] > now:
+            _presigned_url_cache.move_to_end(cache_key)
+            return entry[1]
+
+    url = _generate_presigned_url(s3_key, expiration_seconds, response_content_disposition, response_content_type)
+    if url:
+        with _presigned_url_lock:
+            _presigned_url_cache[cache_key] = (now + expiration_seconds // 2, url)
+            _presigned_url_cache.move_to_end(cache_key)
+            while len(_presigned_url_cache) > PRESIGNED_URL_CACHE_MAXSIZE:
+                _presigned_url_cache.popitem(last=False)
+    return url
+
+def _generate_presigned_url(s3_key: str, expiration_seconds: int,
+                            response_content_disposition: str | None = None,
+                            response_content_type: str | None = None) -> str | None:
+    """Signs a fresh presigned GET URL, bypassing the URL cache."""
     
     logger.debug(f"Generating presigned URL for key '{s3_key}'")
     
+    params = {'Bucket': S3_BUCKET_NAME, 'Key': s3_key}
+    if response_content_disposition:
+        params['ResponseContentDisposition'] = response_content_disposition
+    if response_content_type:
+        params['ResponseContentType'] = response_content_type
+    
     try:
         url = s3_client.generate_presigned_url(
             'get_object',
-            Params={'Bucket': S3_BUCKET_NAME, 'Key': s3_key},
+            Params=params,
             ExpiresIn=expiration_seconds
         )
         return url
@@ -132,6 +404,110 @@ def get_s3_presigned_url(s3_key: str, expiration_seconds: int = 3600) -> str | N
         logger.exception(f"Unexpected error during presigned URL generation: {e}")
         return None 
 
+class _SigV4BatchPresigner:
+    """
+    Presigns GET URLs for many keys from one botocore-generated seed URL.
+    The endpoint, credential scope and SigV4 signing key are resolved once;
+    each further key only costs one canonical-request hash and one HMAC.
+    """
+
+    def __init__(self, seed_url: str, seed_key: str, secret_key: str):
+        parts = urlsplit(seed_url)
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        query = dict(params)
+        if query.get('X-Amz-Algorithm') != 'AWS4-HMAC-SHA256' or query.get('X-Amz-SignedHeaders') != 'host':
+            raise ValueError("Seed URL is not a SigV4 host-signed presigned URL")
+
+        encoded_seed_key = quote(seed_key, safe='/~')
+        if not parts.path.endswith(encoded_seed_key):
+            raise ValueError("Seed URL path does not end with the seed key")
+
+        self._base = f"{parts.scheme}://{parts.netloc}"
+        self._host = parts.netloc
+        self._path_prefix = parts.path[:-len(encoded_seed_key)]
+        self._amz_date = query['X-Amz-Date']
+        self._scope = query['X-Amz-Credential'].split('/', 1)[1]
+        unsigned = [(k, v) for k, v in params if k != 'X-Amz-Signature']
+        self._canonical_query = '&'.join(
+            f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}" for k, v in sorted(unsigned)
+        )
+        self._query = '&'.join(
+            f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}" for k, v in unsigned
+        )
+
+        date_stamp, region, service, _ = self._scope.split('/')
+        signing_key = ('AWS4' + secret_key).encode('utf-8')
+        for part in (date_stamp, region, service, 'aws4_request'):
+            signing_key = hmac.new(signing_key, part.encode('utf-8'), hashlib.sha256).digest()
+        self._signing_key = signing_key
+
+    def sign(self, s3_key: str) -> str:
+        path = self._path_prefix + quote(s3_key, safe='/~')
+        canonical_request = '\n'.join([
+            'GET', path, self._canonical_query, f"host:{self._host}\n", 'host', 'UNSIGNED-PAYLOAD'
+        ])
+        string_to_sign = '\n'.join([
+            'AWS4-HMAC-SHA256',
+            self._amz_date,
+            self._scope,
+            hashlib.sha256(canonical_request.encode('utf-8')).hexdigest(),
+        ])
+        signature = hmac.new(self._signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+        return f"{self._base}{path}?{self._query}&X-Amz-Signature={signature}"
+
+def _presign_batch(s3_keys: tuple[str, ...], expiration_seconds: int) -> dict[str, str] | None:
+    """Presigns GET URLs for a batch of keys, reusing one signing key when the client signs with SigV4."""
+    if not s3_keys:
+        return {}
+
+    seed_url = _generate_presigned_url(s3_keys[0], expiration_seconds)
+    if not seed_url:
+        return None
+    urls = {s3_keys[0]: seed_url}
+    if len(s3_keys) == 1:
+        return urls
+
+    try:
+        credentials = s3_client._request_signer._credentials.get_frozen_credentials()
+        presigner = _SigV4BatchPresigner(seed_url, s3_keys[0], credentials.secret_key)
+    except Exception as e:
+        logger.debug(f"Batch presigning unavailable, signing keys individually: {e}")
+        presigner = None
+
+    for s3_key in s3_keys[1:]:
+        url = presigner.sign(s3_key) if presigner else _generate_presigned_url(s3_key, expiration_seconds)
+        if not url:
+            return None
+        urls[s3_key] = url
+    return urls
+
+def get_presigned_urls_for_job(job_id, s3_keys: list[str], expiration_seconds: int = 3600) -> dict[str, str] | None:
+    """
+    Returns presigned URLs for a job's S3 keys, keyed by S3 key.
+    A batch is reused for repeated polls until half its lifetime has elapsed,
+    or until the job's set of keys changes.
+    """
+    cache_key = str(job_id)
+    keys = tuple(s3_keys)
+    now = time.monotonic()
+
+    with _presigned_batch_lock:
+        entry = _presigned_batch_cache.get(cache_key)
+        if entry and entry[0] > now and entry[1] == keys:
+            _presigned_batch_cache.move_to_end(cache_key)
+            return dict(entry[2])
+
+    urls = _presign_batch(keys, expiration_seconds)
+    if urls is None:
+        return None
+
+    with _presigned_batch_lock:
+        _presigned_batch_cache[cache_key] = (now + expiration_seconds // 2, keys, urls)
+        _presigned_batch_cache.move_to_end(cache_key)
+        while len(_presigned_batch_cache) > PRESIGNED_BATCH_CACHE_MAXSIZE:
+            _presigned_batch_cache.popitem(last=False)
+    return dict(urls)
+
 def upload_content_to_s3(content: bytes, s3_key: str, content_type: str | None = None) -> str | None:
     """Uploads bytes content directly to the configured S3 bucket."""
     if not _is_bucket_configured():
@@ -140,15 +516,21 @@ def upload_content_to_s3(content: bytes, s3_key: str, content_type: str | None =
     extra_args = {}
     if content_type:
         extra_args['ContentType'] = content_type
+    if _is_compressible(content_type):
+        content = gzip.compress(content, compresslevel=GZIP_COMPRESS_LEVEL)
+        extra_args['ContentEncoding'] = 'gzip'
         
     logger.info(f"Uploading content to S3 key '{s3_key}'")
     
     try:
-        s3_client.upload_fileobj(
-            io.BytesIO(content),
-            S3_BUCKET_NAME, 
-            s3_key,
-            ExtraArgs=extra_args
+        retry_s3_call(
+            lambda: s3_client.upload_fileobj(
+                io.BytesIO(content),
+                S3_BUCKET_NAME, 
+                s3_key,
+                ExtraArgs=extra_args,
+                Config=S3_TRANSFER_CONFIG
+            )
         )
         logger.info(f"Successfully uploaded content to {s3_key}")
         return s3_key
@@ -166,6 +548,12 @@ async def download_from_s3_async(s3_key: str) -> bytes | None:
     return await loop.run_in_executor(_executor, download_from_s3, s3_key)
 
 
+async def stream_from_s3_async(s3_key: str, chunk_size: int = RESPONSE_CHUNK_SIZE) -> Iterator[bytes] | None:
+    """Async version of stream_from_s3. Only opening the object runs on the executor."""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(_executor, stream_from_s3, s3_key, chunk_size)
+
+
 async def upload_content_to_s3_async(content: bytes, s3_key: str, content_type: str | None = None) -> str | None:
     """Async version of upload_content_to_s3."""
     loop = asyncio.get_event_loop()
@@ -190,7 +578,8 @@ def upload_fileobj_to_s3(file_obj, filename: str, content_type: str | None = Non
             file_obj, 
             S3_BUCKET_NAME, 
             unique_key,
-            ExtraArgs=extra_args
+            ExtraArgs=extra_args,
+            Config=S3_TRANSFER_CONFIG
         )
         logger.info(f"Successfully uploaded {filename}")
         return unique_key
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationInfo, field_validator
 from typing import List, Optional
 import uuid
 import datetime
@@ -26,18 +26,14 @@ class Job(JobBase):
     final_tex_s3_path: Optional[str] = None
     final_pdf_s3_path: Optional[str] = None
 
-    class Config:
-        from_attributes = True
-        use_enum_values = True
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)
 
 class JobStatusResponse(BaseModel):
     job_id: uuid.UUID
     status: JobStatus
     error_message: Optional[str] = None
 
-    class Config:
-        from_attributes = True
-        use_enum_values = True
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)
 
 class UploadAcceptResponse(BaseModel):
     message: str
@@ -53,8 +49,7 @@ class JobPageImagesResponse(BaseModel):
     job_id: uuid.UUID
     pages: List[PageImageInfo] = Field(..., description="List of rendered page images for the job")
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # --- Segmentation Schemas ---
 class SegmentationBase(BaseModel):
@@ -65,20 +60,19 @@ class SegmentationBase(BaseModel):
     height: float = Field(..., gt=0.0, le=1.0)
     label: Optional[str] = Field(None)
 
-    class Config:
-        populate_by_name = True
-        from_attributes = True
-        use_enum_values = True
+    model_config = ConfigDict(populate_by_name=True, from_attributes=True, use_enum_values=True)
 
-    @validator('width')
-    def check_x_plus_width(cls, v, values, **kwargs):
-        if 'x' in values and values['x'] + v > 1.0:
+    @field_validator('width')
+    @classmethod
+    def check_x_plus_width(cls, v: float, info: ValidationInfo) -> float:
+        if 'x' in info.data and info.data['x'] + v > 1.0:
             raise ValueError('x + width must be <= 1.0')
         return v
 
-    @validator('height')
-    def check_y_plus_height(cls, v, values, **kwargs):
-        if 'y' in values and values['y'] + v > 1.0:
+    @field_validator('height')
+    @classmethod
+    def check_y_plus_height(cls, v: float, info: ValidationInfo) -> float:
+        if 'y' in info.data and info.data['y'] + v > 1.0:
             raise ValueError('y + height must be <= 1.0')
         return v
 
@@ -94,10 +88,7 @@ class Segmentation(SegmentationBase):
     created_at: datetime.datetime
     updated_at: Optional[datetime.datetime] = None
 
-    class Config:
-        populate_by_name = True
-        from_attributes = True
-        use_enum_values = True
+    model_config = ConfigDict(populate_by_name=True, from_attributes=True, use_enum_values=True)
 
 
 class EnhanceRequest(BaseModel):
@@ -127,4 +118,8 @@ class SegmentationTaskItem(BaseModel):
 
 class SegmentationTaskListResponse(BaseModel):
     job_id: uuid.UUID
-    tasks: List[SegmentationTaskItem] = Field(..., description="List of placeholders and descriptions") 
\ No newline at end of file
+    tasks: List[SegmentationTaskItem] = Field(..., description="List of placeholders and descriptions")
+
+# --- Pre-built adapters for list responses ---
+JobListAdapter = TypeAdapter(List[Job])
+SegmentationListAdapter = TypeAdapter(List[Segmentation])
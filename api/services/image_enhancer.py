@@ -3,16 +3,42 @@ Generic image enhancement service interface.
 Implementations can use different models (GPT-4o+DALL-E, Gemini, etc.)
 """
 
+import asyncio
 import base64
 import io
 from abc import ABC, abstractmethod
 from typing import Optional
-from PIL import Image
+
+from openai import AsyncOpenAI
+from google import genai
+from google.genai import types
 
 from ..config import get_logger
 
 logger = get_logger(__name__)
 
+_ENHANCER_PROMPT = """Recreate this hand-drawn diagram as a clean, professional figure suitable for a LaTeX academic document.
+
+Description: {description}
+
+Requirements:
+- Clean, minimalist style matching LaTeX/academic paper aesthetics
+- Black lines on white background (standard for LaTeX figures)
+- Preserve ALL text labels, values, and annotations exactly as shown
+- Use clear geometric shapes and crisp lines
+- Sans-serif or Computer Modern style fonts for any text
+- High contrast, print-ready quality
+- Maintain the exact same layout and spatial relationships
+- No decorative elements - pure technical illustration style"""
+
+
+def _build_prompt(description: str, additional_context: Optional[str] = None) -> str:
+    """Fill the shared enhancer prompt with the diagram description."""
+    prompt = _ENHANCER_PROMPT.format(description=description)
+    if additional_context:
+        prompt += "\n\nAdditional context: " + additional_context
+    return prompt
+
 
 class ImageEnhancer(ABC):
     """Abstract base class for image enhancement services."""
@@ -65,6 +91,7 @@ class OpenAIEnhancer(ImageEnhancer):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key not provided")
+        self._client = AsyncOpenAI(api_key=self.api_key)
     
     async def enhance(
         self, 
@@ -72,40 +99,18 @@ class OpenAIEnhancer(ImageEnhancer):
         description: str,
         additional_context: Optional[str] = None
     ) -> bytes:
-        from openai import OpenAI
-        import asyncio
-        
-        client = OpenAI(api_key=self.api_key)
-        
-        prompt = f"""Recreate this hand-drawn diagram as a clean, professional figure suitable for a LaTeX academic document.
-
-Description: {description}
-
-Requirements:
-- Clean, minimalist style matching LaTeX/academic paper aesthetics
-- Black lines on white background (standard for LaTeX figures)
-- Preserve ALL text labels, values, and annotations exactly as shown
-- Use clear geometric shapes and crisp lines
-- Sans-serif or Computer Modern style fonts for any text
-- High contrast, print-ready quality
-- Maintain the exact same layout and spatial relationships
-- No decorative elements - pure technical illustration style"""
+        prompt = _build_prompt(description, additional_context)
 
         logger.info(f"Generating enhanced image with description: {description[:100]}...")
         
-        def generate():
-            image_file = io.BytesIO(image)
-            image_file.name = "image.png"
-            
-            result = client.images.edit(
-                model="gpt-image-1",
-                image=image_file,
-                prompt=prompt
-            )
-            return result
+        image_file = io.BytesIO(image)
+        image_file.name = "image.png"
         
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, generate)
+        result = await self._client.images.edit(
+            model="gpt-image-1",
+            image=image_file,
+            prompt=prompt
+        )
         
         image_base64 = result.data[0].b64_json
         enhanced_bytes = base64.b64decode(image_base64)
@@ -124,6 +129,7 @@ class GeminiEnhancer(ImageEnhancer):
         self.api_key = api_key or os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("Google API key not provided")
+        self._client = genai.Client(api_key=self.api_key)
     
     async def enhance(
         self, 
@@ -131,44 +137,25 @@ class GeminiEnhancer(ImageEnhancer):
         description: str,
         additional_context: Optional[str] = None
     ) -> bytes:
-        from google import genai
-        from PIL import Image as PILImage
-        import asyncio
-        
-        client = genai.Client(api_key=self.api_key)
-        
-        input_image = PILImage.open(io.BytesIO(image))
+        input_image = types.Part.from_bytes(data=image, mime_type="image/png")
         
-        prompt = f"""Recreate this hand-drawn diagram as a clean, professional figure suitable for a LaTeX academic document.
-
-Description: {description}
-
-Requirements:
-- Clean, minimalist style matching LaTeX/academic paper aesthetics
-- Black lines on white background (standard for LaTeX figures)
-- Preserve ALL text labels, values, and annotations exactly as shown
-- Use clear geometric shapes and crisp lines
-- Sans-serif or Computer Modern style fonts for any text
-- High contrast, print-ready quality
-- Maintain the exact same layout and spatial relationships
-- No decorative elements - pure technical illustration style"""
+        prompt = _build_prompt(description, additional_context)
 
         logger.info(f"Generating enhanced image with Gemini, description: {description[:100]}...")
         
-        def generate():
-            response = client.models.generate_content(
-                model="gemini-3-pro-image-preview",
-                contents=[prompt, input_image],
-            )
-            
-            for part in response.candidates[0].content.parts:
-                if part.inline_data:
-                    return part.inline_data.data
-            
-            raise ValueError("No image returned from Gemini")
+        response = await self._client.aio.models.generate_content(
+            model="gemini-3-pro-image-preview",
+            contents=[prompt, input_image],
+        )
         
-        loop = asyncio.get_event_loop()
-        result_bytes = await loop.run_in_executor(None, generate)
+        result_bytes = None
+        for part in response.candidates[0].content.parts:
+            if part.inline_data:
+                result_bytes = part.inline_data.data
+                break
+        
+        if result_bytes is None:
+            raise ValueError("No image returned from Gemini")
         
         logger.info("Successfully generated enhanced image with Gemini")
         return result_bytes
@@ -176,6 +163,9 @@ Requirements:
 
 _enhancer_instance: Optional[ImageEnhancer] = None
 
+MAX_CONCURRENT_ENHANCEMENTS = 16
+_enhance_semaphore = asyncio.Semaphore(MAX_CONCURRENT_ENHANCEMENTS)
+
 
 def get_image_enhancer() -> ImageEnhancer:
     """Get the configured image enhancer instance."""
@@ -204,4 +194,5 @@ async def enhance_image(
 ) -> bytes:
     """Convenience function to enhance an image using the configured enhancer."""
     enhancer = get_image_enhancer()
-    return await enhancer.enhance(image, description, additional_context)
+    async with _enhance_semaphore:
+        return await enhancer.enhance(image, description, additional_context)
@@ -1,35 +1,74 @@
+import codecs
 import datetime
+import hashlib
+import io
+import json
 import uuid
 import tempfile
 import os
 import subprocess
 import re
-from typing import List, Dict
+import threading
+from collections import OrderedDict, defaultdict
+from typing import List, Dict, Iterable
+import redis
 from PIL import Image
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from boto3.s3.transfer import create_transfer_manager
+from botocore.exceptions import ClientError
+from sqlalchemy import and_
+
 from .celery_app import celery_app
 from .database import SessionLocal
 from . import models
-from .config import get_logger
-from .s3_utils import download_from_s3, upload_local_file_to_s3, S3_BUCKET_NAME, s3_client
+from .config import get_logger, get_celery_config
+from .s3_utils import copy_s3_object, download_from_s3, download_file_from_s3, stream_from_s3, upload_content_to_s3, upload_local_file_to_s3, S3_BUCKET_NAME, S3_BATCH_TRANSFER_CONFIG, retry_s3_call, s3_client
 
-_upload_executor = ThreadPoolExecutor(max_workers=8)
+_upload_executor = ThreadPoolExecutor(max_workers=16)
+_download_executor = ThreadPoolExecutor(max_workers=16)
+_crop_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4)
 
 from packages.core_converter.src.core_converter.pdf_processing.processor import render_pdf_pages_to_images
-from packages.core_converter.src.core_converter.vlm_interaction.api_client import get_latex_from_image
+from packages.core_converter.src.core_converter.vlm_interaction.api_client import PROMPT_VERSION, get_latex_from_image
 from packages.core_converter.src.core_converter.latex_generation.generator import save_latex_to_file, wrap_latex_fragment
 
 logger = get_logger(__name__)
 
+_PLACEHOLDER_SPLIT_RE = re.compile(r'\nPlaceholder:\s*')
+_DESC_RE = re.compile(r"(STRUCTURE-\d+|DIAGRAM-\d+)\s*\nDescription:\s*(.*)", re.DOTALL)
+_PAGE_RE = re.compile(r"page_(\d+)\.(jpg|png)")
+_DOCCLASS_RE = re.compile(r"\\documentclass(\[[^\]]*\])?\{[^\}]*\}")
+_LABEL_SAFE_RE = re.compile(r'[^a-zA-Z0-9_\-]')
+_PLACEHOLDER_COMMENT_RE = re.compile(r"% PLACEHOLDER: (\S+)")
+_PLACEHOLDER_NAME_RE = re.compile(r"\b(STRUCTURE|DIAGRAM)-(\d+)\b")
+_USEPACKAGE_LINE_RE = re.compile(r"^[ \t]*(\\usepackage\b.*?)[ \t\r]*$", re.MULTILINE)
+_BEGIN_DOC = "\\begin{document}"
+_END_DOC = "\\end{document}"
+MAX_VLM_WORKERS = 8
+# Page renders are already JPEG; JPEG crops are several times smaller than PNG and
+# pdflatex embeds them as-is instead of re-encoding the pixels.
+CROP_JPEG_QUALITY = 90
+LOG_TAIL_BYTES = 64 * 1024
+VLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+# latexmk rewrites .aux/.log and reads every figure on each pass; LATEX_TMPDIR can point its
+# working directory at a tmpfs large enough for concurrent compiles (Docker's /dev/shm is 64 MB).
+LATEX_TMPDIR = os.getenv("LATEX_TMPDIR") or None
+
+_vlm_cache = None
+
+PAGE_IMAGE_CACHE_MAXSIZE = 32
+_page_image_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_page_image_cache_lock = threading.Lock()
+
 def parse_descriptions(text: str) -> Dict[str, str]:
     """Parse placeholder descriptions from VLM output."""
     descriptions = {}
-    parts = re.split(r'\nPlaceholder:\s*', '\n' + text.strip())
+    parts = _PLACEHOLDER_SPLIT_RE.split('\n' + text.strip())
     for part in parts:
         if not part.strip():
             continue
-        match = re.match(r"(STRUCTURE-\d+|DIAGRAM-\d+)\s*\nDescription:\s*(.*)", part, re.DOTALL)
+        match = _DESC_RE.match(part)
         if match:
             placeholder_name = match.group(1).strip()
             description = match.group(2).strip()
@@ -38,12 +77,290 @@ def parse_descriptions(text: str) -> Dict[str, str]:
             logger.warning(f"Could not parse description part: '{part[:50]}...'")
     return descriptions
 
-@celery_app.task(bind=True)
+def segmentation_task_sort_key(item: tuple) -> tuple:
+    """Order (placeholder, description) pairs with non-DIAGRAM placeholders first, then by name."""
+    placeholder = item[0]
+    return (placeholder.startswith('DIAGRAM'), placeholder)
+
+def content_etag(content: bytes) -> str:
+    """Returns an MD5 hex digest of content, used as its HTTP entity tag."""
+    return hashlib.md5(content).hexdigest()
+
+def _get_vlm_cache():
+    """Returns a Redis client on the Celery result backend for caching VLM output, or None."""
+    global _vlm_cache
+    if _vlm_cache is None:
+        backend_url = get_celery_config()["result_backend"]
+        if not backend_url or not backend_url.startswith(("redis://", "rediss://")):
+            return None
+        _vlm_cache = redis.Redis.from_url(backend_url, socket_timeout=2)
+    return _vlm_cache
+
+def get_latex_from_image_cached(image_path: str, model_name: str) -> tuple:
+    """
+    Calls get_latex_from_image, caching successful results in Redis keyed by the
+    SHA-256 of the image bytes, the model name and the prompt version. Cache errors
+    never fail the call.
+    """
+    cache = _get_vlm_cache()
+    cache_key = None
+    if cache is not None:
+        try:
+            with open(image_path, 'rb') as f:
+                cache_key = f"vlm:{hashlib.sha256(f.read()).hexdigest()}:{model_name}:{PROMPT_VERSION}"
+            cached = cache.get(cache_key)
+            if cached:
+                logger.info(f"VLM cache hit for {os.path.basename(image_path)}")
+                latex_fragment, descriptions_text = json.loads(cached)
+                return latex_fragment, descriptions_text
+        except Exception as cache_err:
+            logger.warning(f"VLM cache lookup failed: {cache_err}")
+
+    latex_fragment, descriptions_text = get_latex_from_image(image_path, model_name=model_name)
+
+    if cache is not None and cache_key and latex_fragment and "DUMMY_LATEX_OUTPUT" not in latex_fragment:
+        try:
+            cache.setex(cache_key, VLM_CACHE_TTL_SECONDS, json.dumps([latex_fragment, descriptions_text]))
+        except Exception as cache_err:
+            logger.warning(f"VLM cache store failed: {cache_err}")
+    return latex_fragment, descriptions_text
+
+def merge_page_latex(page_results: List[tuple]) -> tuple:
+    """
+    Merge per-page VLM results, in page order, into one document.
+
+    Each page is converted independently, so placeholder numbers restart at 1
+    on every page. They are offset by the counts seen on earlier pages so the
+    merged labels stay unique. The first page's preamble is kept, and bodies
+    are joined with page breaks.
+    """
+    if len(page_results) == 1:
+        return page_results[0]
+
+    offsets = {"STRUCTURE": 0, "DIAGRAM": 0}
+    preamble = None
+    preamble_packages = set()
+    bodies = []
+    descriptions = []
+    for latex, descriptions_text in page_results:
+        page_max = {"STRUCTURE": 0, "DIAGRAM": 0}
+
+        def renumber(match):
+            kind, num = match.group(1), int(match.group(2))
+            page_max[kind] = max(page_max[kind], num)
+            return f"{kind}-{num + offsets[kind]}"
+
+        latex = _PLACEHOLDER_NAME_RE.sub(renumber, latex)
+        descriptions_text = _PLACEHOLDER_NAME_RE.sub(renumber, descriptions_text or "")
+        for kind in offsets:
+            offsets[kind] += page_max[kind]
+
+        begin = latex.find(_BEGIN_DOC)
+        end = latex.rfind(_END_DOC)
+        if begin != -1:
+            if preamble is None:
+                preamble = latex[:begin].rstrip()
+                preamble_packages.update(_USEPACKAGE_LINE_RE.findall(preamble))
+            else:
+                missing = []
+                for package_line in _USEPACKAGE_LINE_RE.findall(latex, 0, begin):
+                    if package_line not in preamble_packages:
+                        preamble_packages.add(package_line)
+                        missing.append(package_line)
+                if missing:
+                    preamble = preamble + "\n" + "\n".join(missing)
+            body = latex[begin + len(_BEGIN_DOC):end if end > begin else len(latex)]
+        else:
+            body = latex
+        bodies.append(body.strip())
+        if descriptions_text.strip():
+            descriptions.append(descriptions_text.strip())
+
+    merged_body = "\n\n\\newpage\n\n".join(bodies)
+    if preamble is None:
+        merged = merged_body
+    else:
+        merged = f"{preamble}\n{_BEGIN_DOC}\n\n{merged_body}\n\n{_END_DOC}"
+    return merged, "\n\n".join(descriptions)
+
+def download_page_image(s3_key: str) -> bytes | None:
+    """
+    download_from_s3 behind a small in-process LRU. Page images are written once per
+    job, so repeated previews and compiles of the same job skip the S3 round-trip.
+    """
+    with _page_image_cache_lock:
+        cached = _page_image_cache.get(s3_key)
+        if cached is not None:
+            _page_image_cache.move_to_end(s3_key)
+            return cached
+    content = download_from_s3(s3_key)
+    if content:
+        with _page_image_cache_lock:
+            _page_image_cache[s3_key] = content
+            _page_image_cache.move_to_end(s3_key)
+            while len(_page_image_cache) > PAGE_IMAGE_CACHE_MAXSIZE:
+                _page_image_cache.popitem(last=False)
+    return content
+
+def download_all_from_s3(s3_paths, cached_paths=frozenset()) -> Dict[str, bytes | None]:
+    """
+    Download several S3 objects concurrently. Paths in cached_paths go through the
+    page image LRU. Failed downloads map to None.
+    """
+    futures = {
+        _download_executor.submit(download_page_image if path in cached_paths else download_from_s3, path): path
+        for path in s3_paths
+    }
+    downloaded = {}
+    for future in as_completed(futures):
+        path = futures[future]
+        try:
+            downloaded[path] = future.result()
+        except Exception as download_err:
+            logger.warning(f"Failed to download {path}: {download_err}")
+            downloaded[path] = None
+    return downloaded
+
+def crop_page_segmentations(page_bytes: bytes, segmentations, figures_dir: str) -> Dict[str, str]:
+    """
+    Crop every segmentation that belongs to one page, decoding the page image once.
+
+    Returns a mapping of segmentation label to the cropped JPEG filename in figures_dir.
+    """
+    cropped_filenames = {}
+    with Image.open(io.BytesIO(page_bytes)) as img:
+        img.load()
+        img_width, img_height = img.size
+        for seg in segmentations:
+            x1 = max(0, seg.x * img_width)
+            y1 = max(0, seg.y * img_height)
+            x2 = min(img_width, (seg.x + seg.width) * img_width)
+            y2 = min(img_height, (seg.y + seg.height) * img_height)
+            if x1 >= x2 or y1 >= y2:
+                logger.warning(f"Invalid crop dimensions for segmentation {seg.label}. Skipping.")
+                continue
+            cropped_filename = f"{_LABEL_SAFE_RE.sub('_', seg.label)}.jpg"
+            try:
+                cropped = img.crop((int(x1), int(y1), int(x2), int(y2)))
+                if cropped.mode not in ("RGB", "L"):
+                    cropped = cropped.convert("RGB")
+                cropped.save(os.path.join(figures_dir, cropped_filename), "JPEG", quality=CROP_JPEG_QUALITY)
+                cropped_filenames[seg.label] = cropped_filename
+                logger.debug(f"Cropped {seg.label} from page {seg.page_number}")
+            except Exception as crop_err:
+                logger.error(f"Error cropping segmentation {seg.label}: {crop_err}")
+    return cropped_filenames
+
+def crop_all_pages(pages: Iterable[tuple], figures_dir: str) -> Dict[str, str]:
+    """
+    Crop several pages' segmentations concurrently; PIL releases the GIL while decoding,
+    cropping and encoding. pages yields (page_number, page_bytes, segmentations) tuples.
+
+    Returns a mapping of segmentation label to the cropped JPEG filename in figures_dir.
+    A page that fails to crop is logged and skipped.
+    """
+    futures = {
+        _crop_executor.submit(crop_page_segmentations, page_bytes, page_segs, figures_dir): page_number
+        for page_number, page_bytes, page_segs in pages
+    }
+    cropped_filenames = {}
+    for future in as_completed(futures):
+        try:
+            cropped_filenames.update(future.result())
+        except Exception as crop_err:
+            logger.error(f"Error cropping segmentations on page {futures[future]}: {crop_err}")
+    return cropped_filenames
+
+def read_log_tail(log_path: str, max_bytes: int = LOG_TAIL_BYTES) -> str:
+    """
+    Read at most the last max_bytes of a TeX log. With -halt-on-error the failure is
+    reported at the end of the log, so the tail is all the error handlers need.
+    """
+    with open(log_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        offset = max(0, size - max_bytes)
+        f.seek(offset)
+        tail = f.read().decode('utf-8', errors='replace')
+    if offset:
+        tail = tail.partition('\n')[2]
+    return tail
+
+def load_segmentations_with_pages(db, job_id) -> tuple:
+    """
+    Fetch a job's segmentations together with the S3 path of each one's page image
+    in a single query. Returns (segmentations, {page_number: page_image_s3_path}).
+    """
+    rows = (
+        db.query(models.Segmentation, models.JobPageImage.s3_path)
+        .outerjoin(
+            models.JobPageImage,
+            and_(
+                models.JobPageImage.job_id == models.Segmentation.job_id,
+                models.JobPageImage.page_number == models.Segmentation.page_number,
+            ),
+        )
+        .filter(models.Segmentation.job_id == job_id)
+        .all()
+    )
+    segmentations = [seg for seg, _ in rows]
+    page_paths = {seg.page_number: s3_path for seg, s3_path in rows if s3_path}
+    return segmentations, page_paths
+
+def release_db_connection(db) -> None:
+    """
+    Commit so the session returns its pooled connection before slow external work
+    (S3 transfers, rendering, VLM calls, latexmk). Task sessions use
+    expire_on_commit=False, so already-loaded attributes stay readable without
+    checking a connection out again.
+    """
+    db.commit()
+
+def build_figure_include(label: str, figure_path: str) -> str:
+    """LaTeX figure environment that replaces a segmentation placeholder."""
+    return (
+        f"\\begin{{figure}}[htbp]\n"
+        f"  \\centering\n"
+        f"  \\includegraphics[width=0.8\\textwidth]{{{figure_path}}}\n"
+        f"  \\caption{{{label.replace('_', ' ')}}}\n"
+        f"  \\label{{fig:{label.lower()}}}\n"
+        f"\\end{{figure}}"
+    )
+
+def substitute_placeholders(text: str, replacements: Dict[str, str]) -> str:
+    """Replace every `% PLACEHOLDER: <label>` comment with replacements[label] in one pass."""
+    if not replacements:
+        return text
+    return _PLACEHOLDER_COMMENT_RE.sub(lambda m: replacements.get(m.group(1), m.group(0)), text)
+
+def write_substituted_tex(chunks: Iterable[bytes], output_path: str, replacements: Dict[str, str]) -> None:
+    """Decode TeX chunks line by line, substitute placeholders (keyed by label) and write the result to output_path."""
+    if not replacements:
+        # Nothing to substitute: copy the bytes through without a decode/encode round-trip.
+        with open(output_path, 'wb') as out:
+            for chunk in chunks:
+                out.write(chunk)
+        return
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+
+    pending = ""
+    with open(output_path, 'w', encoding='utf-8') as out:
+        for chunk in chunks:
+            pending += decoder.decode(chunk)
+            lines = pending.split('\n')
+            pending = lines.pop()
+            for line in lines:
+                out.write(substitute_placeholders(line, replacements) + '\n')
+        pending += decoder.decode(b'', final=True)
+        out.write(substitute_placeholders(pending, replacements))
+
+@celery_app.task(bind=True, acks_late=True)
 def process_handwriting_conversion(self, job_id_str: str):
     """Celery task to process PDF -> Render -> VLM -> Initial TeX."""
     logger.info(f"Starting conversion task for job ID: {job_id_str}")
     job_id = uuid.UUID(job_id_str)
-    db = SessionLocal()
+    db = SessionLocal(expire_on_commit=False)
     job = None
     uploaded_page_image_s3_keys: List[str] = []
     
@@ -54,16 +371,18 @@ def process_handwriting_conversion(self, job_id_str: str):
             self.update_state(state='FAILURE', meta={'exc_type': 'JobNotFound', 'exc_message': f'Job {job_id} not found'})
             return f"Job {job_id} not found."
 
+        # Page rows only exist if an earlier run of this job got past rendering; only then
+        # can its page images already be in S3.
+        is_rerun = db.query(models.JobPageImage.id).filter(models.JobPageImage.job_id == job_id).first() is not None
+
         with tempfile.TemporaryDirectory() as temp_dir:
             logger.info(f"Job {job_id}: Created temp dir {temp_dir}")
 
             logger.info(f"Job {job_id}: Downloading input PDF from S3 path {job.input_pdf_s3_path}")
-            pdf_content = download_from_s3(job.input_pdf_s3_path)
-            if not pdf_content:
-                raise Exception(f"Failed to download input PDF from S3 path: {job.input_pdf_s3_path}")
             temp_pdf_path = os.path.join(temp_dir, job.input_pdf_filename or "input.pdf")
-            with open(temp_pdf_path, 'wb') as f:
-                f.write(pdf_content)
+            release_db_connection(db)
+            if not download_file_from_s3(job.input_pdf_s3_path, temp_pdf_path):
+                raise Exception(f"Failed to download input PDF from S3 path: {job.input_pdf_s3_path}")
             logger.info(f"Job {job_id}: Input PDF saved to {temp_pdf_path}")
 
             job.status = models.JobStatus.RENDERING
@@ -72,70 +391,113 @@ def process_handwriting_conversion(self, job_id_str: str):
             
             page_images_temp_dir = os.path.join(temp_dir, "page_images")
             os.makedirs(page_images_temp_dir, exist_ok=True)
-            rendered_image_paths = render_pdf_pages_to_images(temp_pdf_path, page_images_temp_dir)
-            if not rendered_image_paths:
-                raise Exception("Failed to render PDF pages to images.")
-            logger.info(f"Job {job_id}: PDF rendered to {len(rendered_image_paths)} images")
-
-            logger.info(f"Job {job_id}: Uploading page images to S3...")
             page_image_s3_keys_map = {}
             
             def upload_single_page(image_path):
-                match = re.search(r"page_(\d+)\.(jpg|png)", os.path.basename(image_path))
+                match = _PAGE_RE.search(os.path.basename(image_path))
                 if not match:
                     return None
                 page_num = int(match.group(1))
                 ext = match.group(2)
                 content_type = 'image/jpeg' if ext == 'jpg' else 'image/png'
                 s3_key = f"pages/{job_id}/page_{page_num}.{ext}"
-                s3_client.upload_file(
-                    Filename=image_path, Bucket=S3_BUCKET_NAME, Key=s3_key,
-                    ExtraArgs={'ContentType': content_type}
+                existed = False
+                if is_rerun:
+                    try:
+                        head = s3_client.head_object(Bucket=S3_BUCKET_NAME, Key=s3_key)
+                        if head.get('ContentLength') == os.path.getsize(image_path):
+                            logger.debug(f"Page image {s3_key} already uploaded; skipping")
+                            return (page_num, s3_key, image_path, False)
+                        existed = True
+                    except ClientError:
+                        pass
+                retry_s3_call(
+                    lambda: transfer_manager.upload(
+                        image_path, S3_BUCKET_NAME, s3_key, extra_args={'ContentType': content_type}
+                    ).result()
                 )
-                return (page_num, s3_key, image_path)
+                # Only keys this run created are removed on failure; earlier page rows may point at the rest.
+                return (page_num, s3_key, image_path, not existed)
             
-            futures = {_upload_executor.submit(upload_single_page, path): path for path in rendered_image_paths}
-            for future in as_completed(futures):
+            futures = {}
+            vlm_futures = {}
+            # Each page goes to the VLM as soon as it is rendered, so the model calls overlap
+            # with rendering and uploading the rest of the document.
+            vlm_executor = ThreadPoolExecutor(max_workers=MAX_VLM_WORKERS)
+            def queue_page(image_path):
+                futures[_upload_executor.submit(upload_single_page, image_path)] = image_path
+                vlm_futures[image_path] = vlm_executor.submit(get_latex_from_image_cached, image_path, job.model_used)
+
+            try:
+                # One TransferManager for every page of the job, instead of upload_file building
+                # (and tearing down) a manager and its worker threads per page.
+                transfer_manager = create_transfer_manager(s3_client, S3_BATCH_TRANSFER_CONFIG)
+                logger.info(f"Job {job_id}: Rendering pages and uploading them to S3 as they complete...")
+                upload_error = None
                 try:
-                    result = future.result()
-                    if result:
-                        page_num, s3_key, image_path = result
-                        uploaded_page_image_s3_keys.append(s3_key)
-                        page_image_s3_keys_map[page_num] = s3_key
-                        logger.debug(f"Uploaded {image_path} to S3 key {s3_key}")
-                except Exception as upload_err:
-                    raise Exception(f"Failed to upload page image to S3: {upload_err}") from upload_err
-            logger.info(f"Job {job_id}: Successfully uploaded {len(uploaded_page_image_s3_keys)} page images.")
-
-            logger.info(f"Job {job_id}: Storing page image paths in database...")
-            page_image_records = []
-            for page_num, s3_key in page_image_s3_keys_map.items():
-                page_image_record = models.JobPageImage(job_id=job_id, page_number=page_num, s3_path=s3_key)
-                page_image_records.append(page_image_record)
-            if page_image_records:
+                    rendered_image_paths = render_pdf_pages_to_images(temp_pdf_path, page_images_temp_dir, on_page=queue_page)
+                    for future in as_completed(futures):
+                        if future.cancelled():
+                            continue
+                        try:
+                            result = future.result()
+                            if result:
+                                page_num, s3_key, image_path, created = result
+                                if created:
+                                    uploaded_page_image_s3_keys.append(s3_key)
+                                page_image_s3_keys_map[page_num] = s3_key
+                                logger.debug(f"Uploaded {image_path} to S3 key {s3_key}")
+                        except Exception as upload_err:
+                            if upload_error is None:
+                                upload_error = upload_err
+                                # The job fails anyway; drop queued uploads but keep collecting running ones for cleanup.
+                                for pending in futures:
+                                    pending.cancel()
+                finally:
+                    transfer_manager.shutdown()
+                if not rendered_image_paths:
+                    raise Exception("Failed to render PDF pages to images.")
+                logger.info(f"Job {job_id}: PDF rendered to {len(rendered_image_paths)} images")
+                if upload_error:
+                    raise Exception(f"Failed to upload page image to S3: {upload_error}") from upload_error
+                logger.info(f"Job {job_id}: Successfully uploaded {len(page_image_s3_keys_map)} page images.")
+
+                logger.info(f"Job {job_id}: Storing page image paths in database...")
+                page_image_mappings = [
+                    {"job_id": job_id, "page_number": page_num, "s3_path": s3_key}
+                    for page_num, s3_key in page_image_s3_keys_map.items()
+                ]
+                # Page rows and the PROCESSING_VLM transition share one transaction. A re-run
+                # replaces the rows of the earlier attempt instead of colliding with them.
+                job.status = models.JobStatus.PROCESSING_VLM
                 try:
-                    db.add_all(page_image_records)
+                    if is_rerun:
+                        db.query(models.JobPageImage).filter(
+                            models.JobPageImage.job_id == job_id
+                        ).delete(synchronize_session=False)
+                    if page_image_mappings:
+                        db.bulk_insert_mappings(models.JobPageImage, page_image_mappings)
                     db.commit()
-                    logger.info(f"Job {job_id}: Stored {len(page_image_records)} page image records in DB.")
+                    logger.info(f"Job {job_id}: Stored {len(page_image_mappings)} page image records in DB.")
                 except Exception as db_err:
                     db.rollback()
                     raise Exception(f"Failed to store page image records in database: {db_err}") from db_err
-
-            job.status = models.JobStatus.PROCESSING_VLM
-            db.commit()
-            logger.info(f"Job {job_id}: Status set to PROCESSING_VLM")
+                logger.info(f"Job {job_id}: Status set to PROCESSING_VLM")
             
-            first_page_image_path = os.path.join(page_images_temp_dir, "page_0.png")
-            if not os.path.exists(first_page_image_path):
-                if rendered_image_paths:
-                    first_page_image_path = rendered_image_paths[0]
-                else:
-                    raise Exception("No rendered images found, cannot proceed with VLM.")
-            
-            logger.info(f"Job {job_id}: Using first page image for VLM input.")
-            latex_content_fragment, descriptions_text = get_latex_from_image(first_page_image_path, model_name=job.model_used)
-            if not latex_content_fragment or "DUMMY_LATEX_OUTPUT" in latex_content_fragment:
-                raise Exception(f"VLM processing failed or returned dummy content for model {job.model_used}.")
+                def page_sort_key(path):
+                    match = _PAGE_RE.search(os.path.basename(path))
+                    return int(match.group(1)) if match else 0
+
+                vlm_image_paths = sorted(rendered_image_paths, key=page_sort_key)
+                logger.info(f"Job {job_id}: Waiting for VLM results for {len(vlm_image_paths)} pages...")
+                page_results = [vlm_futures[path].result() for path in vlm_image_paths]
+            finally:
+                # On failure, queued model calls are dropped; running ones finish before the temp dir goes.
+                vlm_executor.shutdown(cancel_futures=True)
+            for page_index, (page_fragment, _) in enumerate(page_results):
+                if not page_fragment or "DUMMY_LATEX_OUTPUT" in page_fragment:
+                    raise Exception(f"VLM processing failed or returned dummy content for model {job.model_used} on page {page_index}.")
+            latex_content_fragment, descriptions_text = merge_page_latex(page_results)
             logger.info(f"Job {job_id}: VLM processing successful")
 
             logger.info(f"Job {job_id}: Wrapping LaTeX fragment...")
@@ -145,15 +507,14 @@ def process_handwriting_conversion(self, job_id_str: str):
             descriptions_mapping = parse_descriptions(descriptions_text)
             if descriptions_mapping:
                 logger.info(f"Job {job_id}: Parsed {len(descriptions_mapping)} descriptions.")
-                job.segmentation_tasks = descriptions_mapping
-                db.commit()
+                # Stored pre-sorted (JSON keeps key order) so reads get an already-ordered mapping.
+                job.segmentation_tasks = dict(sorted(descriptions_mapping.items(), key=segmentation_task_sort_key))
             else:
                 logger.info(f"Job {job_id}: No descriptions found from VLM output.")
                 job.segmentation_tasks = {}
-                db.commit()
 
             if "\\begin{tikzpicture}" in latex_content and "\\usepackage{tikz}" not in latex_content:
-                documentclass_match = re.search(r"\\documentclass(\[[^\]]*\])?\{[^\}]*\}", latex_content)
+                documentclass_match = _DOCCLASS_RE.search(latex_content)
                 if documentclass_match:
                     insert_pos = documentclass_match.end()
                     latex_content = latex_content[:insert_pos] + "\n\\usepackage{tikz}" + latex_content[insert_pos:]
@@ -186,10 +547,9 @@ def process_handwriting_conversion(self, job_id_str: str):
             job.initial_tex_s3_path = initial_tex_s3_path_result
             job.final_tex_s3_path = None
             job.final_pdf_s3_path = None
+            job.final_pdf_etag = None
             job.completed_at = None
             job.error_message = None
-            db.commit()
-            logger.info(f"Job {job_id}: Updated database with initial TeX S3 path.")
 
         logger.info(f"Job {job_id}: Temporary directory cleaned up.")
 
@@ -203,7 +563,9 @@ def process_handwriting_conversion(self, job_id_str: str):
             final_message = f"Job {job_id} initial processing completed. Awaiting segmentation."
             
         job.updated_at = datetime.datetime.now(datetime.timezone.utc)
+        # Segmentation tasks, TeX paths and the final status are written in a single commit.
         db.commit()
+        logger.info(f"Job {job_id}: Updated database with initial TeX S3 path.")
         return final_message
 
     except Exception as e:
@@ -218,7 +580,8 @@ def process_handwriting_conversion(self, job_id_str: str):
             logger.info(f"Job {job_id}: Cleaning up {len(uploaded_page_image_s3_keys)} uploaded page images...")
             try:
                 objects_to_delete = [{'Key': key} for key in uploaded_page_image_s3_keys]
-                s3_client.delete_objects(
+                retry_s3_call(
+                    s3_client.delete_objects,
                     Bucket=S3_BUCKET_NAME,
                     Delete={'Objects': objects_to_delete, 'Quiet': True}
                 )
@@ -236,7 +599,7 @@ def compile_final_document(self, job_id_str: str):
     """Celery task to compile the final LaTeX document after segmentation."""
     logger.info(f"Starting final compilation task for job ID: {job_id_str}")
     job_id = uuid.UUID(job_id_str)
-    db = SessionLocal()
+    db = SessionLocal(expire_on_commit=False)
     job = None
     
     try:
@@ -254,97 +617,72 @@ def compile_final_document(self, job_id_str: str):
         if not job.initial_tex_s3_path:
             raise ValueError("Initial TeX S3 path is missing for this job.")
 
-        segmentations = db.query(models.Segmentation).filter(models.Segmentation.job_id == job_id).all()
-        page_images_db = db.query(models.JobPageImage).filter(models.JobPageImage.job_id == job_id).all()
-        page_images_map = {p.page_number: p for p in page_images_db}
+        segmentations, page_image_paths = load_segmentations_with_pages(db, job_id)
 
         if not segmentations:
             logger.info(f"Job {job_id}: No segmentations found. Proceeding with initial TeX file.")
+        release_db_connection(db)
 
-        with tempfile.TemporaryDirectory() as temp_dir:
+        with tempfile.TemporaryDirectory(dir=LATEX_TMPDIR) as temp_dir:
             logger.info(f"Job {job_id}: Created temp dir for final compilation")
             figures_dir = os.path.join(temp_dir, "figures")
             os.makedirs(figures_dir, exist_ok=True)
 
-            logger.info(f"Job {job_id}: Downloading initial TeX")
-            initial_tex_content_bytes = download_from_s3(job.initial_tex_s3_path)
-            if not initial_tex_content_bytes:
-                raise Exception(f"Failed to download initial TeX file: {job.initial_tex_s3_path}")
-            initial_tex_path = os.path.join(temp_dir, "initial.tex")
-            with open(initial_tex_path, 'wb') as f:
-                f.write(initial_tex_content_bytes)
-            initial_tex_content = initial_tex_content_bytes.decode('utf-8')
+            enhanced_paths = set()
+            page_paths = set()
+            for seg in segmentations:
+                if seg.use_enhanced and seg.enhanced_s3_path:
+                    enhanced_paths.add(seg.enhanced_s3_path)
+                elif seg.page_number in page_image_paths:
+                    page_paths.add(page_image_paths[seg.page_number])
+            prefetch_paths = enhanced_paths | page_paths
+            logger.info(f"Job {job_id}: Downloading {len(prefetch_paths)} images for segmentations")
+            downloaded_bytes = download_all_from_s3(prefetch_paths, cached_paths=page_paths)
 
             cropped_image_paths = {}
+            segs_by_page = defaultdict(list)
             for seg in segmentations:
-                safe_label = re.sub(r'[^a-zA-Z0-9_\-]', '_', seg.label)
-                cropped_filename = f"{safe_label}.png"
-                cropped_image_output_path = os.path.join(figures_dir, cropped_filename)
-                
                 if seg.use_enhanced and seg.enhanced_s3_path:
-                    logger.info(f"Job {job_id}: Using enhanced image for {seg.label}")
-                    enhanced_bytes = download_from_s3(seg.enhanced_s3_path)
+                    enhanced_bytes = downloaded_bytes.get(seg.enhanced_s3_path)
                     if enhanced_bytes:
-                        with open(cropped_image_output_path, 'wb') as f:
+                        logger.info(f"Job {job_id}: Using enhanced image for {seg.label}")
+                        cropped_filename = f"{_LABEL_SAFE_RE.sub('_', seg.label)}.png"
+                        with open(os.path.join(figures_dir, cropped_filename), 'wb') as f:
                             f.write(enhanced_bytes)
                         cropped_image_paths[seg.label] = f"figures/{cropped_filename}"
                         continue
-                
-                page_image_record = page_images_map.get(seg.page_number)
-                if not page_image_record:
-                    logger.warning(f"Could not find page image for page {seg.page_number}. Skipping.")
-                    continue
+                segs_by_page[seg.page_number].append(seg)
 
-                page_image_s3_path = page_image_record.s3_path
-                page_image_filename = os.path.basename(page_image_s3_path)
-                temp_page_image_path = os.path.join(temp_dir, page_image_filename)
+            pages_to_crop = []
+            for page_number, page_segs in segs_by_page.items():
+                page_image_s3_path = page_image_paths.get(page_number)
+                if not page_image_s3_path:
+                    logger.warning(f"Could not find page image for page {page_number}. Skipping.")
+                    continue
 
-                if not os.path.exists(temp_page_image_path):
+                if page_image_s3_path not in downloaded_bytes:
                     logger.info(f"Job {job_id}: Downloading page image {page_image_s3_path}")
-                    page_image_bytes = download_from_s3(page_image_s3_path)
-                    if not page_image_bytes:
-                        logger.warning(f"Failed to download page image {page_image_s3_path}. Skipping.")
-                        continue
-                    with open(temp_page_image_path, 'wb') as f:
-                        f.write(page_image_bytes)
+                    downloaded_bytes[page_image_s3_path] = download_page_image(page_image_s3_path)
+                page_image_bytes = downloaded_bytes[page_image_s3_path]
+                if not page_image_bytes:
+                    logger.warning(f"Failed to download page image {page_image_s3_path}. Skipping.")
+                    continue
+                pages_to_crop.append((page_number, page_image_bytes, page_segs))
 
-                try:
-                    with Image.open(temp_page_image_path) as img:
-                        img_width, img_height = img.size
-                        x1 = seg.x * img_width
-                        y1 = seg.y * img_height
-                        x2 = (seg.x + seg.width) * img_width
-                        y2 = (seg.y + seg.height) * img_height
-                        x1, y1 = max(0, x1), max(0, y1)
-                        x2, y2 = min(img_width, x2), min(img_height, y2)
-                        if x1 >= x2 or y1 >= y2:
-                            logger.warning(f"Invalid crop dimensions for segmentation {seg.label}. Skipping.")
-                            continue
-                        crop_box = (int(x1), int(y1), int(x2), int(y2))
-                        cropped_img = img.crop(crop_box)
-                        cropped_img.save(cropped_image_output_path, "PNG")
-                        cropped_image_paths[seg.label] = f"figures/{cropped_filename}"
-                        logger.debug(f"Cropped {seg.label} from page {seg.page_number}")
-                except Exception as crop_err:
-                    logger.error(f"Error cropping segmentation {seg.label}: {crop_err}")
-
-            modified_tex_content = initial_tex_content
-            for label, figure_path in cropped_image_paths.items():
-                placeholder_comment = f"% PLACEHOLDER: {label}"
-                figure_include_code = (
-                    f"\\begin{{figure}}[htbp]\n"
-                    f"  \\centering\n"
-                    f"  \\includegraphics[width=0.8\\textwidth]{{{figure_path}}}\n"
-                    f"  \\caption{{{label.replace('_', ' ')}}}\n"
-                    f"  \\label{{fig:{label.lower()}}}\n"
-                    f"\\end{{figure}}"
-                )
-                modified_tex_content = modified_tex_content.replace(placeholder_comment, figure_include_code)
-                logger.debug(f"Replaced placeholder for {label}")
+            for label, cropped_filename in crop_all_pages(pages_to_crop, figures_dir).items():
+                cropped_image_paths[label] = f"figures/{cropped_filename}"
 
+            replacements = {
+                label: build_figure_include(label, figure_path)
+                for label, figure_path in cropped_image_paths.items()
+            }
+
+            logger.info(f"Job {job_id}: Streaming initial TeX")
+            initial_tex_chunks = stream_from_s3(job.initial_tex_s3_path)
+            if initial_tex_chunks is None:
+                raise Exception(f"Failed to download initial TeX file: {job.initial_tex_s3_path}")
             final_tex_path = os.path.join(temp_dir, "final.tex")
-            with open(final_tex_path, 'w', encoding='utf-8') as f:
-                f.write(modified_tex_content)
+            write_substituted_tex(initial_tex_chunks, final_tex_path, replacements)
             logger.info(f"Job {job_id}: Final LaTeX content saved")
 
             output_pdf_filename = "final.pdf"
@@ -362,21 +700,20 @@ def compile_final_document(self, job_id_str: str):
                     "-output-directory=" + temp_dir,
                     final_tex_path
                 ]
+                # stdout is discarded: latexmk's transcript is in final.log, read only on failure.
                 result = subprocess.run(
                     compile_cmd, 
                     cwd=temp_dir, 
-                    capture_output=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
                     timeout=120
                 )
-                stdout_decoded = result.stdout.decode('utf-8', errors='replace')
-                stderr_decoded = result.stderr.decode('utf-8', errors='replace')
                 
                 if result.returncode != 0:
                     raise subprocess.CalledProcessError(
                         result.returncode, 
                         compile_cmd, 
-                        output=stdout_decoded, 
-                        stderr=stderr_decoded
+                        stderr=result.stderr.decode('utf-8', errors='replace')
                     )
                 logger.info(f"Job {job_id}: latexmk successful.")
                 
@@ -389,9 +726,7 @@ def compile_final_document(self, job_id_str: str):
                 log_path = os.path.join(temp_dir, "final.log")
                 if os.path.exists(log_path):
                     try:
-                        with open(log_path, 'rb') as log_f:
-                            log_bytes = log_f.read()
-                        full_log = log_bytes.decode('utf-8', errors='replace')
+                        full_log = read_log_tail(log_path)
                         error_lines = [line for line in full_log.splitlines() if line.startswith('!') or "Error:" in line]
                         if error_lines:
                             error_log_content = "\n".join(error_lines[-15:])
@@ -427,16 +762,24 @@ def compile_final_document(self, job_id_str: str):
                 final_pdf_s3_key = f"outputs/final_pdf/{job_id}.pdf"
                 try:
                     logger.info(f"Job {job_id}: Uploading final TeX file to S3")
-                    tex_upload_result = upload_local_file_to_s3(final_tex_path, final_tex_s3_key, content_type='text/plain')
+                    if segmentations:
+                        tex_upload_result = upload_local_file_to_s3(final_tex_path, final_tex_s3_key, content_type='text/plain')
+                    else:
+                        # Nothing was substituted, so the final TeX is the initial TeX; copy it server-side.
+                        tex_upload_result = copy_s3_object(job.initial_tex_s3_path, final_tex_s3_key)
                     if not tex_upload_result:
                         raise Exception(f"Failed to upload final TeX file to {final_tex_s3_key}")
                     job.final_tex_s3_path = tex_upload_result
 
                     logger.info(f"Job {job_id}: Uploading final PDF file to S3")
-                    pdf_upload_result = upload_local_file_to_s3(temp_pdf_path, final_pdf_s3_key, content_type='application/pdf')
+                    # Read the PDF once: the same buffer feeds the upload and the ETag.
+                    with open(temp_pdf_path, 'rb') as f:
+                        pdf_bytes = f.read()
+                    pdf_upload_result = upload_content_to_s3(pdf_bytes, final_pdf_s3_key, content_type='application/pdf')
                     if not pdf_upload_result:
                         raise Exception(f"Failed to upload final PDF file to {final_pdf_s3_key}")
                     job.final_pdf_s3_path = pdf_upload_result
+                    job.final_pdf_etag = content_etag(pdf_bytes)
 
                     job.status = models.JobStatus.COMPILATION_COMPLETE
                     job.completed_at = datetime.datetime.now(datetime.timezone.utc)
@@ -479,7 +822,7 @@ def compile_latex_preview(self, tex_content: str):
     import base64
     logger.info("Starting LaTeX preview compilation task")
     
-    with tempfile.TemporaryDirectory() as temp_dir:
+    with tempfile.TemporaryDirectory(dir=LATEX_TMPDIR) as temp_dir:
         tex_path = os.path.join(temp_dir, "preview.tex")
         pdf_path = os.path.join(temp_dir, "preview.pdf")
         log_path = os.path.join(temp_dir, "preview.log")
@@ -501,15 +844,15 @@ def compile_latex_preview(self, tex_content: str):
             result = subprocess.run(
                 compile_cmd,
                 cwd=temp_dir,
-                capture_output=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
                 timeout=60
             )
             
             if result.returncode != 0 or not os.path.exists(pdf_path):
                 error_msg = "Compilation failed"
                 if os.path.exists(log_path):
-                    with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
-                        log_content = f.read()
+                    log_content = read_log_tail(log_path)
                     error_lines = [line for line in log_content.splitlines() 
                                    if line.startswith('!') or "Error:" in line]
                     if error_lines:
@@ -536,82 +879,65 @@ def compile_latex_preview(self, tex_content: str):
 def compile_latex_preview_with_images(self, job_id_str: str, tex_content: str):
     """Celery task to compile LaTeX with segmentation images and return PDF bytes as base64."""
     import base64
-    from io import BytesIO
     
     logger.info(f"Starting LaTeX preview with images compilation for job {job_id_str}")
     job_id = uuid.UUID(job_id_str)
-    db = SessionLocal()
+    db = SessionLocal(expire_on_commit=False)
     
     try:
         job = db.query(models.Job).filter(models.Job.id == job_id).first()
         if not job:
             return {"success": False, "error": f"Job {job_id} not found"}
         
-        segmentations = db.query(models.Segmentation).filter(
-            models.Segmentation.job_id == job_id
-        ).all()
-        
-        page_images = db.query(models.JobPageImage).filter(
-            models.JobPageImage.job_id == job_id
-        ).all()
-        page_images_map = {p.page_number: p for p in page_images}
+        segmentations, page_image_paths = load_segmentations_with_pages(db, job_id)
+        release_db_connection(db)
         
-        with tempfile.TemporaryDirectory() as temp_dir:
+        with tempfile.TemporaryDirectory(dir=LATEX_TMPDIR) as temp_dir:
             figures_dir = os.path.join(temp_dir, "figures")
             os.makedirs(figures_dir, exist_ok=True)
             
+            enhanced_paths = set()
+            page_paths = set()
+            for seg in segmentations:
+                if seg.use_enhanced and seg.enhanced_s3_path:
+                    enhanced_paths.add(seg.enhanced_s3_path)
+                elif seg.page_number in page_image_paths:
+                    page_paths.add(page_image_paths[seg.page_number])
+            prefetch_paths = enhanced_paths | page_paths
+            downloaded_bytes = download_all_from_s3(prefetch_paths, cached_paths=page_paths)
+            
+            figure_filenames = {}
+            segs_by_page = defaultdict(list)
             for seg in segmentations:
-                safe_label = re.sub(r'[^a-zA-Z0-9_\-]', '_', seg.label)
-                cropped_filename = f"{safe_label}.png"
-                cropped_image_output_path = os.path.join(figures_dir, cropped_filename)
-                
                 if seg.use_enhanced and seg.enhanced_s3_path:
-                    enhanced_bytes = download_from_s3(seg.enhanced_s3_path)
+                    enhanced_bytes = downloaded_bytes.get(seg.enhanced_s3_path)
                     if enhanced_bytes:
-                        with open(cropped_image_output_path, 'wb') as f:
+                        cropped_filename = f"{_LABEL_SAFE_RE.sub('_', seg.label)}.png"
+                        with open(os.path.join(figures_dir, cropped_filename), 'wb') as f:
                             f.write(enhanced_bytes)
+                        figure_filenames[seg.label] = cropped_filename
                         continue
-                
-                page_record = page_images_map.get(seg.page_number)
-                if not page_record:
+                segs_by_page[seg.page_number].append(seg)
+            
+            pages_to_crop = []
+            for page_number, page_segs in segs_by_page.items():
+                page_s3_path = page_image_paths.get(page_number)
+                if not page_s3_path:
                     continue
                     
-                page_bytes = download_from_s3(page_record.s3_path)
+                if page_s3_path not in downloaded_bytes:
+                    downloaded_bytes[page_s3_path] = download_page_image(page_s3_path)
+                page_bytes = downloaded_bytes[page_s3_path]
                 if not page_bytes:
                     continue
-                
-                try:
-                    with Image.open(BytesIO(page_bytes)) as img:
-                        img_width, img_height = img.size
-                        x1 = seg.x * img_width
-                        y1 = seg.y * img_height
-                        x2 = (seg.x + seg.width) * img_width
-                        y2 = (seg.y + seg.height) * img_height
-                        x1, y1 = max(0, x1), max(0, y1)
-                        x2, y2 = min(img_width, x2), min(img_height, y2)
-                        if x1 >= x2 or y1 >= y2:
-                            continue
-                        crop_box = (int(x1), int(y1), int(x2), int(y2))
-                        cropped_img = img.crop(crop_box)
-                        cropped_img.save(cropped_image_output_path, "PNG")
-                except Exception as crop_err:
-                    logger.warning(f"Error cropping segmentation {seg.label}: {crop_err}")
+                pages_to_crop.append((page_number, page_bytes, page_segs))
+            figure_filenames.update(crop_all_pages(pages_to_crop, figures_dir))
             
-            modified_tex_content = tex_content
-            for seg in segmentations:
-                safe_label = re.sub(r'[^a-zA-Z0-9_\-]', '_', seg.label)
-                figure_path = f"figures/{safe_label}.png"
-                if os.path.exists(os.path.join(temp_dir, figure_path)):
-                    placeholder_comment = f"% PLACEHOLDER: {seg.label}"
-                    figure_include_code = (
-                        f"\\begin{{figure}}[htbp]\n"
-                        f"  \\centering\n"
-                        f"  \\includegraphics[width=0.8\\textwidth]{{{figure_path}}}\n"
-                        f"  \\caption{{{seg.label.replace('_', ' ')}}}\n"
-                        f"  \\label{{fig:{seg.label.lower()}}}\n"
-                        f"\\end{{figure}}"
-                    )
-                    modified_tex_content = modified_tex_content.replace(placeholder_comment, figure_include_code)
+            replacements = {
+                label: build_figure_include(label, f"figures/{filename}")
+                for label, filename in figure_filenames.items()
+            }
+            modified_tex_content = substitute_placeholders(tex_content, replacements)
             
             tex_path = os.path.join(temp_dir, "preview.tex")
             pdf_path = os.path.join(temp_dir, "preview.pdf")
@@ -633,15 +959,15 @@ def compile_latex_preview_with_images(self, job_id_str: str, tex_content: str):
                 result = subprocess.run(
                     compile_cmd,
                     cwd=temp_dir,
-                    capture_output=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
                     timeout=60
                 )
                 
                 if not os.path.exists(pdf_path):
                     error_msg = "Compilation failed - no output PDF"
                     if os.path.exists(log_path):
-                        with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
-                            log_content = f.read()
+                        log_content = read_log_tail(log_path)
                         error_lines = [line for line in log_content.splitlines() 
                                        if line.startswith('!') or "Error:" in line]
                         if error_lines:
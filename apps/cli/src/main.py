@@ -7,6 +7,7 @@ import os
 import time
 import subprocess # Added for running external commands
 import shutil # Added for checking if latexmk is available
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Import functions from our modules (now using the installable package)
 from core_converter.pdf_processing.processor import render_pdf_to_image
@@ -20,6 +21,7 @@ PROJECT_ROOT = os.path.dirname(BASE_DIR)
 DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'output_latex')
 DEFAULT_IMAGE_DIR = os.path.join(PROJECT_ROOT, 'output_images') # For intermediate images
 DEFAULT_MODEL = "o4-mini"
+MAX_CONCURRENT_MODELS = 8 # Upper bound on simultaneous VLM requests
 
 def compile_latex_to_pdf(tex_filepath: str, output_directory: str) -> bool:
     """
@@ -103,6 +105,13 @@ def main(pdf_path: str, output_dir: str, models_to_run: list[str]):
     """Runs the main conversion pipeline for one or more models."""
     print(f"Starting conversion process for: {pdf_path}")
     print(f"Models to run: {', '.join(models_to_run)}")
+
+    # Every model call would fall back to the dummy output without a key, so stop before rendering.
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key or api_key == "YOUR_OPENAI_KEY_HERE":
+        print("Error: OPENAI_API_KEY is not set (or is the placeholder value). Exiting.")
+        return
+
     overall_start_time = time.time()
 
     # --- 1. Define Base Paths & Render PDF (Done once) ---
@@ -110,7 +119,7 @@ def main(pdf_path: str, output_dir: str, models_to_run: list[str]):
     base_filename = os.path.splitext(pdf_filename)[0]
     
     os.makedirs(DEFAULT_IMAGE_DIR, exist_ok=True)
-    image_output_path = os.path.join(DEFAULT_IMAGE_DIR, f"{base_filename}_page0.png")
+    image_output_path = os.path.join(DEFAULT_IMAGE_DIR, f"{base_filename}_page0.jpg")
     
     print("\nStep 1: Rendering PDF to image (once for all models)...")
     generated_image_path = render_pdf_to_image(pdf_path, image_output_path)
@@ -119,41 +128,53 @@ def main(pdf_path: str, output_dir: str, models_to_run: list[str]):
         print("Failed to render PDF to image. Exiting.")
         return
 
-    # --- Loop Through Models --- 
-    all_success = True
-    for model_name in models_to_run:
+    # --- 2. Get LaTeX from Image (via VLM), all models concurrently ---
+    def run_model(model_name):
         model_start_time = time.time()
-        print(f"\n===== Processing Model: {model_name} =====")
-
-        # --- 2. Get LaTeX from Image (via VLM) ---
         print(f"Step 2: Sending image to {model_name} for LaTeX conversion...")
         # Unpack the tuple returned by get_latex_from_image
         latex_content, descriptions_text = get_latex_from_image(generated_image_path, model_name=model_name)
-        
-        # Check if LaTeX content is missing or if it's the dummy/placeholder output
-        if not latex_content or "DUMMY_LATEX_OUTPUT" in latex_content:
-            print(f"Failed to get LaTeX from {model_name} (or placeholder failed). Skipping model.")
-            all_success = False
-            continue # Move to the next model
-
-        # --- 3. Save LaTeX to File ---
-        # Modify output filename to include model name and input base filename
-        os.makedirs(output_dir, exist_ok=True)
-        tex_output_path = os.path.join(output_dir, f"{base_filename}_{model_name}.tex")
-        
-        print(f"Step 3: Saving generated LaTeX content for {model_name}...")
-        # Pass only the latex_content string to the save function
-        success = save_latex_to_file(latex_content, tex_output_path)
-        if success:
-            print(f"Output LaTeX file for {model_name} saved to: {tex_output_path}")
-            # Attempt to compile the generated .tex file to PDF
-            compile_latex_to_pdf(tex_output_path, output_dir)
-        else:
-            print(f"Failed to save the LaTeX file for {model_name}.")
-            all_success = False
-        
-        model_end_time = time.time()
-        print(f"===== Finished processing {model_name} in {model_end_time - model_start_time:.2f} seconds =====")
+        return latex_content, model_start_time
+
+    # The calls are network-bound, so threads let the slowest model set the wall time
+    # instead of the sum of all of them.
+    all_success = True
+    with ThreadPoolExecutor(max_workers=min(len(models_to_run), MAX_CONCURRENT_MODELS)) as executor:
+        futures = {executor.submit(run_model, model_name): model_name for model_name in models_to_run}
+        for future in as_completed(futures):
+            model_name = futures[future]
+            print(f"\n===== Processing Model: {model_name} =====")
+            try:
+                latex_content, model_start_time = future.result()
+            except Exception as e:
+                print(f"Error calling {model_name}: {e}. Skipping model.")
+                all_success = False
+                continue
+
+            # Check if LaTeX content is missing or if it's the dummy/placeholder output
+            if not latex_content or "DUMMY_LATEX_OUTPUT" in latex_content:
+                print(f"Failed to get LaTeX from {model_name} (or placeholder failed). Skipping model.")
+                all_success = False
+                continue # Move to the next model
+
+            # --- 3. Save LaTeX to File ---
+            # Modify output filename to include model name and input base filename
+            os.makedirs(output_dir, exist_ok=True)
+            tex_output_path = os.path.join(output_dir, f"{base_filename}_{model_name}.tex")
+
+            print(f"Step 3: Saving generated LaTeX content for {model_name}...")
+            # Pass only the latex_content string to the save function
+            success = save_latex_to_file(latex_content, tex_output_path)
+            if success:
+                print(f"Output LaTeX file for {model_name} saved to: {tex_output_path}")
+                # Attempt to compile the generated .tex file to PDF
+                compile_latex_to_pdf(tex_output_path, output_dir)
+            else:
+                print(f"Failed to save the LaTeX file for {model_name}.")
+                all_success = False
+
+            model_end_time = time.time()
+            print(f"===== Finished processing {model_name} in {model_end_time - model_start_time:.2f} seconds =====")
 
     # --- 4. Clean up and Final Report ---
     # Optionally delete intermediate image after all models are processed
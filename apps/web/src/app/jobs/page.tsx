@@ -389,7 +389,7 @@ export default function JobsPage() {
                           <Button
                             variant="outline"
                             size="sm"
-                            onClick={() => window.open(`${API_BASE_URL}/jobs/${job.id}/tex`, '_blank')}
+                            onClick={() => window.open(`${API_BASE_URL}/jobs/${job.id}/tex?redirect=true`, '_blank')}
                             title="Download TeX file"
                             className="gap-1.5"
                           >
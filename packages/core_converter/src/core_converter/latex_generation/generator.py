@@ -3,6 +3,7 @@ Handles the generation and saving of LaTeX (.tex) files.
 """
 
 import os
+import re
 
 # Default LaTeX preamble and document structure
 DEFAULT_PREAMBLE = r"""\documentclass{article}
@@ -15,6 +16,9 @@ DEFAULT_PREAMBLE = r"""\documentclass{article}
 \setlength{\parindent}{0pt} % Optional: Remove paragraph indentation
 """
 
+# Leading whitespace then \documentclass; matched in place instead of stripping a copy of the fragment
+FULL_DOCUMENT_RE = re.compile(r"\s*\\documentclass")
+
 DEFAULT_BEGIN_DOCUMENT = r"\begin{document}"
 DEFAULT_END_DOCUMENT = r"\end{document}"
 
@@ -32,7 +36,7 @@ def wrap_latex_fragment(fragment: str, preamble: str = DEFAULT_PREAMBLE, begin_d
         A string containing the full LaTeX document.
     """
     # Basic check to prevent wrapping if it already looks like a full doc
-    if fragment.strip().startswith("\\documentclass"):
+    if FULL_DOCUMENT_RE.match(fragment):
         print("Warning: Fragment already seems to be a full document. Returning as is.")
         return fragment
         
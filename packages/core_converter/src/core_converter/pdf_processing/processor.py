@@ -3,21 +3,59 @@ Handles processing of PDF files, primarily rendering pages to images.
 """
 
 import fitz  # PyMuPDF
+import logging
+import multiprocessing
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from PIL import Image
-from typing import List # Import List
+from typing import Callable, List, Optional, Sequence # Import List
+
+log = logging.getLogger(__name__)
 
 DEFAULT_DPI = 120
 JPEG_QUALITY = 85
+# PyMuPDF is not thread-safe, so pages are rendered in separate processes. Defaults to 1
+# (render in-process) because the worker's CPU quota is usually lower than os.cpu_count().
+RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "1"))
+
+# Pages encoded concurrently with rendering; also bounds how many decoded pages wait in memory.
+SAVE_AHEAD_PAGES = 2
+
+def _page_to_image(page, dpi: int) -> Image.Image:
+    """Renders one page into a PIL image (the pixmap is released on return)."""
+    pix = page.get_pixmap(dpi=dpi)
+    
+    # samples_mv is a view of the pixmap buffer; samples would copy every pixel first.
+    return Image.frombytes("RGB", [pix.width, pix.height], pix.samples_mv)
+
+def _save_jpeg(img: Image.Image, output_image_path: str) -> str:
+    """Encodes a page image as JPEG; PIL releases the GIL while encoding."""
+    img.save(output_image_path, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return output_image_path
 
-def render_pdf_pages_to_images(pdf_path: str, output_dir: str, dpi: int = DEFAULT_DPI) -> List[str]:
+def _render_page(pdf_path: str, page_index: int, output_dir: str, dpi: int) -> str:
+    """Process-pool worker: opens its own copy of the document and renders one page."""
+    output_image_path = os.path.join(output_dir, f"page_{page_index}.jpg")
+    with fitz.open(pdf_path) as doc:
+        img = _page_to_image(doc[page_index], dpi)
+    return _save_jpeg(img, output_image_path)
+
+def render_pdf_pages_to_images(pdf_path: str, output_dir: str, dpi: int = DEFAULT_DPI,
+                               on_page: Optional[Callable[[str], None]] = None,
+                               workers: int = RENDER_WORKERS,
+                               page_indices: Optional[Sequence[int]] = None) -> List[str]:
     """
-    Renders *all* pages of a PDF to individual image files (JPEG format for smaller size).
+    Renders the pages of a PDF to individual image files (JPEG format for smaller size).
 
     Args:
         pdf_path: Path to the input PDF file.
         output_dir: Directory where the output JPEG images will be saved.
         dpi: Resolution (dots per inch) for rendering the images.
+        on_page: Optional callback invoked with each image path as soon as it is saved,
+                 so callers can start processing a page while later pages render.
+        workers: Number of processes to render pages in; 1 renders in this process.
+        page_indices: Zero-based pages to render, in output order; defaults to all pages.
 
     Returns:
         A list of paths to the generated image files if successful, an empty list otherwise.
@@ -33,22 +71,56 @@ def render_pdf_pages_to_images(pdf_path: str, output_dir: str, dpi: int = DEFAUL
             print(f"Error: PDF '{pdf_path}' has no pages.")
             return []
 
-        print(f"Rendering {doc.page_count} pages from '{pdf_path}' to '{output_dir}'...")
-
-        for i, page in enumerate(doc.pages()):
-            output_image_path = os.path.join(output_dir, f"page_{i}.jpg")
-            
-            pix = page.get_pixmap(dpi=dpi)
-            
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
-            img.save(output_image_path, "JPEG", quality=JPEG_QUALITY, optimize=True)
-            generated_image_paths.append(output_image_path)
-            print(f"  - Saved {output_image_path}")
+        if page_indices is None:
+            pages = enumerate(doc.pages())
+            page_indices = range(doc.page_count)
+        else:
+            pages = ((i, doc[i]) for i in page_indices)
+
+        print(f"Rendering {len(page_indices)} pages from '{pdf_path}' to '{output_dir}'...")
+
+        # One progress line per ~5% of pages rather than a print (and stdout flush) per page.
+        progress_every = max(1, len(page_indices) // 20)
+        saved_count = 0
+
+        def page_saved(output_image_path):
+            nonlocal saved_count
+            saved_count += 1
+            log.debug("Saved %s", output_image_path)
+            if saved_count % progress_every == 0 or saved_count == len(page_indices):
+                print(f"  - Saved {saved_count}/{len(page_indices)} pages")
+            if on_page:
+                on_page(output_image_path)
+
+        workers = min(workers, len(page_indices))
+        if workers > 1:
+            doc.close()
+            doc = None
+            # spawn, not fork: the caller may be a threaded worker holding locks.
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = [executor.submit(_render_page, pdf_path, i, output_dir, dpi) for i in page_indices]
+                for future in as_completed(futures):
+                    page_saved(future.result())
+            generated_image_paths = [future.result() for future in futures]
+        else:
+            # MuPDF renders the next page while earlier pages are JPEG-encoded on other threads.
+            def finish_oldest():
+                output_image_path = pending.popleft().result()
+                generated_image_paths.append(output_image_path)
+                page_saved(output_image_path)
+
+            pending = deque()
+            with ThreadPoolExecutor(max_workers=SAVE_AHEAD_PAGES) as save_pool:
+                for i, page in pages:
+                    output_image_path = os.path.join(output_dir, f"page_{i}.jpg")
+                    pending.append(save_pool.submit(_save_jpeg, _page_to_image(page, dpi), output_image_path))
+                    if len(pending) > SAVE_AHEAD_PAGES:
+                        finish_oldest()
+                while pending:
+                    finish_oldest()
         
         print(f"Successfully rendered {len(generated_image_paths)} pages.")
         
-        doc.close()
         return generated_image_paths
 
     except FileNotFoundError:
@@ -56,9 +128,13 @@ def render_pdf_pages_to_images(pdf_path: str, output_dir: str, dpi: int = DEFAUL
         return []
     except Exception as e:
         print(f"An unexpected error occurred during PDF page rendering: {e}")
-        if doc: # Check if doc was opened before error
-            doc.close()
         return []
+    finally:
+        if doc is not None: # Check if doc was opened before error
+            doc.close()
+        # MuPDF keeps decoded fonts and images in a process-wide store after the document
+        # is closed; empty it so a long-lived worker does not carry it into the next job.
+        fitz.TOOLS.store_shrink(100)
 
 # Optional: Keep the old function signature for backward compatibility 
 # if other parts of the code still use it, but point it to the new one 
@@ -74,23 +150,23 @@ def render_pdf_to_image(pdf_path: str, output_image_path: str, dpi: int = DEFAUL
     output_dir = os.path.dirname(output_image_path)
     base_name = os.path.basename(output_image_path)
     if not base_name:
-        base_name = "page_0.png" # Default if only dir provided
+        base_name = "page_0.jpg" # Default if only dir provided
         output_image_path = os.path.join(output_dir, base_name)
         
     try:
-        # Call the new function, but only expect one result for page 0
-        results = render_pdf_pages_to_images(pdf_path, output_dir, dpi)
+        # Call the new function for page 0 only
+        results = render_pdf_pages_to_images(pdf_path, output_dir, dpi, page_indices=[0])
         # Find the expected output file in the results (might be named slightly differently)
-        expected_page_0_path = os.path.join(output_dir, "page_0.png")
+        expected_page_0_path = os.path.join(output_dir, "page_0.jpg")
         if expected_page_0_path in results:
-             # If the new function created page_0.png, potentially rename it 
+             # If the new function created page_0.jpg, potentially rename it 
              # if the original output_image_path name was different
              if output_image_path != expected_page_0_path:
                  os.rename(expected_page_0_path, output_image_path)
                  print(f"  - Renamed {expected_page_0_path} to {output_image_path}")
              return output_image_path
-        elif results: # If page_0.png wasn't created but others were, maybe return the first?
-            print(f"Warning: Expected page_0.png not found, returning first rendered image: {results[0]}")
+        elif results: # If page_0.jpg wasn't created but others were, maybe return the first?
+            print(f"Warning: Expected page_0.jpg not found, returning first rendered image: {results[0]}")
             return results[0] # Less ideal, but provides an image
         else:
             return None # No images rendered
@@ -5,14 +5,24 @@ Currently configured for OpenAI API (GPT-4V or similar).
 
 import os
 import base64
+import hashlib
+import json
+import mmap
+from functools import lru_cache
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
-from openai import OpenAI # Import the OpenAI library
 import re # Import regex module
 # import requests # No longer needed for basic OpenAI calls
 
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 # Load environment variables from .env file
 load_dotenv()
 
+# Fenced ```latex ... ``` block in the model response
+LATEX_BLOCK_RE = re.compile(r"```(latex)?\s*(.*?)\s*```", re.DOTALL | re.IGNORECASE)
+
 DUMMY_LATEX_OUTPUT = r"""
 \documentclass{article}
 \usepackage{amsmath}
@@ -26,6 +36,106 @@ $E = mc^2$
 \end{document}
 """
 
+# Static parts of the request, built once at import rather than on every call.
+# 1️⃣  Hard contract
+_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": (
+        "You are a LaTeX transcription assistant specializing in STEM subjects.\n"
+        "Your output MUST contain two parts:\n"
+        "1. A *complete* LaTeX document, starting with `\\documentclass{article}` and ending with `\\end{document}`, wrapped in a single ```latex ... ``` code block. This block MUST contain placeholders (`STRUCTURE-N`, `DIAGRAM-M`) as specified below.\n"
+        "2. After the closing ``` of the LaTeX block, a list of descriptions for EACH placeholder used. Use the exact format:\n"
+        "Placeholder: [Placeholder Name (e.g., STRUCTURE-1)]\nDescription: [Concise textual description]\n"
+        "(Repeat for each placeholder, ensuring each description starts on a new line immediately after 'Description: ')\n\n"
+        "LaTeX Content Rules:\n"
+        "1. Include packages: `amsmath`, `graphicx`, `amssymb`, `mhchem`, `chemfig`, `amsfonts`.\n"
+        "2. Transcribe standard text, equations (use math environments), and symbols accurately.\n"
+        "3. **Inline Math:** Text enclosed in double quotes (e.g., \"expression\") should be treated as an inline mathematical expression and rendered using `$ ... $`.\n"
+        "4. **Paragraphs:** Preserve the paragraph structure from the handwritten input. Use blank lines in the LaTeX source to separate paragraphs.\n"
+        "5. **Chapter Titles:** Identify text formatted like chapter or section titles (e.g., centered, larger font, underlined). Format these using the `\\section*{Title Text}` command. Do not automatically number sections.\n"
+        "6. **Ignore:** Do NOT transcribe any dates or times found in the document.\n"
+        "7. **Chemical Structures/Reactions:** For handwritten molecular drawings or reaction schemes that are part of an equation or text flow:\n"
+        "   - Replace the structure/scheme with a LaTeX comment placeholder: `% PLACEHOLDER: STRUCTURE-N` (start N at 1).\n"
+        "   - Insert this comment placeholder *inline* within the math environment or text where the structure was.\n"
+        "   - Do NOT use `chemfig`, `\\ce{}`, or the raw label (STRUCTURE-N) directly; use the comment placeholder.\n"
+        "8. **General Diagrams:** For graphs, plots, illustrations, flowcharts, etc. NOT inline:\n"
+        "   - On a line *by itself*, write exactly `% PLACEHOLDER: DIAGRAM-M` (start M at 1).\n"
+        "   - Do NOT insert the raw label (DIAGRAM-M) directly.\n"
+        "9. Numbering: Use separate counters for STRUCTURE-N and DIAGRAM-M (within the placeholders and descriptions). Renumber rules as needed.\n"
+        "10. Do NOT generate TikZ or PGFPlots.\n"
+        "11. Include the author command: `\\author{Ramakrishna Kompella}` after the `\\usepackage` commands.\n"
+        "If you violate the output format or rules, the answer will be discarded."
+        "12. **Preserve ALIGNMENT:** When transcribing, ensure that all text alignment (such as centering, right-justification, or left-justification) is faithfully preserved as seen in the handwritten image. For centered content, use `\\begin{center} ... \\end{center}`; for right-aligned text, use `\\begin{flushright} ... \\end{flushright}`. Maintain the spatial and alignment relationships between elements as they appear in the image.\n"
+    )
+}
+
+# 2️⃣  (Optional but helps) one-shot example
+_EXAMPLE_MESSAGE = {
+    "role": "assistant",
+    "content": (
+        "```latex\n"
+        "\\documentclass{article}\n"
+        "\\usepackage{amsmath}\n"
+        "\\usepackage{graphicx}\n"
+        "\\usepackage{amssymb}\n"
+        "\\usepackage{mhchem}\n"
+        "\\usepackage{chemfig}\n"
+        "\\n"
+        "\\author{Ramakrishna Kompella}\n"
+        "\\n"
+        "\\begin{document}\n"
+        "\\n"
+        "The reaction is:\n"
+        "\\[\n"
+        "\\ce{ReactantA} + % PLACEHOLDER: STRUCTURE-1 \\longrightarrow % PLACEHOLDER: STRUCTURE-2 + \\ce{SideProductB}\n"
+        "\\]\n"
+        "\\n"
+        "% PLACEHOLDER: DIAGRAM-1\n"
+        "\\n"
+        "Final energy is $E = mc^2$.\n"
+        "\\n"
+        "\\end{document}\n"
+        "```\n"
+        "Placeholder: STRUCTURE-1\nDescription: Benzene ring with a methyl group.\n"
+        "Placeholder: STRUCTURE-2\nDescription: Cyclohexane molecule.\n"
+        "Placeholder: DIAGRAM-1\nDescription: Plot of Temperature vs Time showing an initial increase followed by a plateau.\n"
+    )
+}
+
+_USER_INSTRUCTION = {
+    "type": "text",
+    "text": (
+        "Convert the handwritten content. First, provide the complete LaTeX document in a ```latex block, using `% PLACEHOLDER: STRUCTURE-N` comment placeholders inline for chemical structures/reactions and `% PLACEHOLDER: DIAGRAM-M` comment placeholders on their own lines for standalone diagrams. "
+        "Second, after the ```latex block, list descriptions for every placeholder used, following the 'Placeholder: ...\\nDescription: ...' format exactly. Adhere strictly to all system rules."
+    )
+}
+
+# Changes whenever the static prompt does, so callers caching responses can key on it.
+PROMPT_VERSION = hashlib.blake2b(
+    json.dumps([_SYSTEM_MESSAGE, _EXAMPLE_MESSAGE, _USER_INSTRUCTION], sort_keys=True).encode('utf-8'),
+    digest_size=8,
+).hexdigest()
+
+@lru_cache(maxsize=8)
+def _encode_image(image_path: str, mtime: float, size: int) -> str:
+    """
+    Base64-encodes an image file. mtime and size only key the cache, so the same
+    image sent to several models is read and encoded once.
+    """
+    if size == 0:
+        return ""
+    # Encoding straight from a read-only mapping skips the bytes copy that read() would make.
+    with open(image_path, "rb") as image_file, \
+            mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return base64.b64encode(mapped).decode('ascii')
+
+@lru_cache(maxsize=1)
+def _get_client(api_key: str) -> "OpenAI":
+    """Returns a shared OpenAI client so its HTTP connection pool is reused across calls."""
+    # Imported here: openai pulls in httpx and pydantic, which runs without a key never need.
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
 def get_latex_from_image(image_path: str, model_name: str = "gpt-4-vision-preview") -> str:
     """
     Sends an image to the specified OpenAI API vision model
@@ -36,7 +146,7 @@ def get_latex_from_image(image_path: str, model_name: str = "gpt-4-vision-previe
     returns a dummy LaTeX string.
 
     Args:
-        image_path: Path to the input image file (PNG format recommended).
+        image_path: Path to the input image file (JPEG or PNG).
         model_name: The specific OpenAI model to use (e.g., 'gpt-4-vision-preview').
 
     Returns:
@@ -51,101 +161,32 @@ def get_latex_from_image(image_path: str, model_name: str = "gpt-4-vision-previe
         if not api_key or api_key == "YOUR_OPENAI_KEY_HERE":
             raise ValueError("Placeholder API key found or OPENAI_API_KEY not set in .env.")
 
-        client = OpenAI()
+        client = _get_client(api_key)
 
         # 2. Encode Image
-        with open(image_path, "rb") as image_file:
-            base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+        image_stat = os.stat(image_path)
+        base64_image = _encode_image(image_path, image_stat.st_mtime, image_stat.st_size)
+        image_mime_type = "image/jpeg" if image_path.lower().endswith((".jpg", ".jpeg")) else "image/png"
 
         # 3. Make API Call
         response = client.chat.completions.create(
-    model=model_name,
-    messages=[
-        # 1️⃣  Hard contract
-        {
-            "role": "system",
-            "content": (
-                "You are a LaTeX transcription assistant specializing in STEM subjects.\n"
-                "Your output MUST contain two parts:\n"
-                "1. A *complete* LaTeX document, starting with `\\documentclass{article}` and ending with `\\end{document}`, wrapped in a single ```latex ... ``` code block. This block MUST contain placeholders (`STRUCTURE-N`, `DIAGRAM-M`) as specified below.\n"
-                "2. After the closing ``` of the LaTeX block, a list of descriptions for EACH placeholder used. Use the exact format:\n"
-                "Placeholder: [Placeholder Name (e.g., STRUCTURE-1)]\nDescription: [Concise textual description]\n"
-                "(Repeat for each placeholder, ensuring each description starts on a new line immediately after 'Description: ')\n\n"
-                "LaTeX Content Rules:\n"
-                "1. Include packages: `amsmath`, `graphicx`, `amssymb`, `mhchem`, `chemfig`, `amsfonts`.\n"
-                "2. Transcribe standard text, equations (use math environments), and symbols accurately.\n"
-                "3. **Inline Math:** Text enclosed in double quotes (e.g., \"expression\") should be treated as an inline mathematical expression and rendered using `$ ... $`.\n"
-                "4. **Paragraphs:** Preserve the paragraph structure from the handwritten input. Use blank lines in the LaTeX source to separate paragraphs.\n"
-                "5. **Chapter Titles:** Identify text formatted like chapter or section titles (e.g., centered, larger font, underlined). Format these using the `\\section*{Title Text}` command. Do not automatically number sections.\n"
-                "6. **Ignore:** Do NOT transcribe any dates or times found in the document.\n"
-                "7. **Chemical Structures/Reactions:** For handwritten molecular drawings or reaction schemes that are part of an equation or text flow:\n"
-                "   - Replace the structure/scheme with a LaTeX comment placeholder: `% PLACEHOLDER: STRUCTURE-N` (start N at 1).\n"
-                "   - Insert this comment placeholder *inline* within the math environment or text where the structure was.\n"
-                "   - Do NOT use `chemfig`, `\\ce{}`, or the raw label (STRUCTURE-N) directly; use the comment placeholder.\n"
-                "8. **General Diagrams:** For graphs, plots, illustrations, flowcharts, etc. NOT inline:\n"
-                "   - On a line *by itself*, write exactly `% PLACEHOLDER: DIAGRAM-M` (start M at 1).\n"
-                "   - Do NOT insert the raw label (DIAGRAM-M) directly.\n"
-                "9. Numbering: Use separate counters for STRUCTURE-N and DIAGRAM-M (within the placeholders and descriptions). Renumber rules as needed.\n"
-                "10. Do NOT generate TikZ or PGFPlots.\n"
-                "11. Include the author command: `\\author{Ramakrishna Kompella}` after the `\\usepackage` commands.\n"
-                "If you violate the output format or rules, the answer will be discarded."
-                "12. **Preserve ALIGNMENT:** When transcribing, ensure that all text alignment (such as centering, right-justification, or left-justification) is faithfully preserved as seen in the handwritten image. For centered content, use `\\begin{center} ... \\end{center}`; for right-aligned text, use `\\begin{flushright} ... \\end{flushright}`. Maintain the spatial and alignment relationships between elements as they appear in the image.\n"
-            )
-        },
-
-        # 2️⃣  (Optional but helps) one-shot example
-        {
-            "role": "assistant",
-            "content": (
-                "```latex\n"
-                "\\documentclass{article}\n"
-                "\\usepackage{amsmath}\n"
-                "\\usepackage{graphicx}\n"
-                "\\usepackage{amssymb}\n"
-                "\\usepackage{mhchem}\n"
-                "\\usepackage{chemfig}\n"
-                "\\n"
-                "\\author{Ramakrishna Kompella}\n"
-                "\\n"
-                "\\begin{document}\n"
-                "\\n"
-                "The reaction is:\n"
-                "\\[\n"
-                "\\ce{ReactantA} + % PLACEHOLDER: STRUCTURE-1 \\longrightarrow % PLACEHOLDER: STRUCTURE-2 + \\ce{SideProductB}\n"
-                "\\]\n"
-                "\\n"
-                "% PLACEHOLDER: DIAGRAM-1\n"
-                "\\n"
-                "Final energy is $E = mc^2$.\n"
-                "\\n"
-                "\\end{document}\n"
-                "```\n"
-                "Placeholder: STRUCTURE-1\nDescription: Benzene ring with a methyl group.\n"
-                "Placeholder: STRUCTURE-2\nDescription: Cyclohexane molecule.\n"
-                "Placeholder: DIAGRAM-1\nDescription: Plot of Temperature vs Time showing an initial increase followed by a plateau.\n"
-            )
-        },
-
-        # 3️⃣  Your actual request
-        {
-            "role": "user",
-            "content": [
-                {
-                    "type": "text",
-                    "text": (
-                        "Convert the handwritten content. First, provide the complete LaTeX document in a ```latex block, using `% PLACEHOLDER: STRUCTURE-N` comment placeholders inline for chemical structures/reactions and `% PLACEHOLDER: DIAGRAM-M` comment placeholders on their own lines for standalone diagrams. "
-                        "Second, after the ```latex block, list descriptions for every placeholder used, following the 'Placeholder: ...\\nDescription: ...' format exactly. Adhere strictly to all system rules."
-                    )
-                },
+            model=model_name,
+            messages=[
+                _SYSTEM_MESSAGE,
+                _EXAMPLE_MESSAGE,
+                # 3️⃣  Your actual request
                 {
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/png;base64,{base64_image}"}
+                    "role": "user",
+                    "content": [
+                        _USER_INSTRUCTION,
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": f"data:{image_mime_type};base64,{base64_image}"}
+                        }
+                    ]
                 }
-            ]
-        }
-    ],
-
-)
+            ],
+        )
 
 
         # 5. Process Response & Extract LaTeX
@@ -156,7 +197,7 @@ def get_latex_from_image(image_path: str, model_name: str = "gpt-4-vision-previe
         descriptions_text = "" # Store the description part separately
 
         # Find the LaTeX block first
-        match_latex = re.search(r"```(latex)?\s*(.*?)\s*```", raw_content, re.DOTALL | re.IGNORECASE)
+        match_latex = LATEX_BLOCK_RE.search(raw_content)
         if match_latex:
             latex_content = match_latex.group(2).strip()
             print("Extracted LaTeX content using ``` block.")
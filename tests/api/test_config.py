@@ -53,6 +53,18 @@ class TestGetLogger:
         assert len(logger.handlers) > 0
         assert logger.level == logging.INFO
 
+    def test_worker_process_shutdown_flushes_log_listener(self):
+        """Test a Celery pool process stops (and so flushes) the log listener before it exits."""
+        from celery.signals import worker_process_shutdown
+        from api import config
+        import api.celery_app  # noqa: F401 - connects the signal handler
+        
+        with patch.object(config, "_log_listener") as mock_listener:
+            worker_process_shutdown.send(sender=None, pid=os.getpid(), exitcode=0)
+            
+            mock_listener.stop.assert_called_once()
+            assert config._log_listener is None
+
 
 class TestGetDatabaseUrl:
     """Tests for get_database_url function."""
@@ -79,6 +91,34 @@ class TestGetDatabaseUrl:
                 get_database_url()
 
 
+class TestGetDbPoolConfig:
+    """Tests for get_db_pool_config function."""
+
+    def test_get_db_pool_config_defaults(self):
+        """Test pool defaults sized for concurrent API traffic."""
+        from api.config import get_db_pool_config
+
+        with patch.dict(os.environ, {}, clear=True):
+            get_db_pool_config.cache_clear()
+            config = get_db_pool_config()
+        get_db_pool_config.cache_clear()
+
+        assert config == {"pool_size": 20, "max_overflow": 40, "pool_recycle": 300, "pool_pre_ping": True}
+
+    def test_get_db_pool_config_from_env(self):
+        """Test pool settings can be overridden from environment."""
+        from api.config import get_db_pool_config
+
+        with patch.dict(os.environ, {"DB_POOL_SIZE": "8", "DB_MAX_OVERFLOW": "4", "DB_POOL_RECYCLE": "60"}):
+            get_db_pool_config.cache_clear()
+            config = get_db_pool_config()
+        get_db_pool_config.cache_clear()
+
+        assert config["pool_size"] == 8
+        assert config["max_overflow"] == 4
+        assert config["pool_recycle"] == 60
+
+
 class TestGetS3Config:
     """Tests for get_s3_config function."""
 
@@ -123,6 +163,18 @@ class TestGetCeleryConfig:
             get_celery_config.cache_clear()
             config = get_celery_config()
             assert "redis://localhost:6379/0" in config["broker_url"]
+            assert config["worker_concurrency"] == 2
+
+    def test_get_celery_config_worker_concurrency_from_env(self):
+        """Test worker concurrency can be raised for I/O-bound deployments."""
+        from api.config import get_celery_config
+
+        with patch.dict(os.environ, {"CELERY_WORKER_CONCURRENCY": "16"}):
+            get_celery_config.cache_clear()
+            config = get_celery_config()
+        get_celery_config.cache_clear()
+
+        assert config["worker_concurrency"] == 16
 
 
 class TestGetCorsOrigins:
@@ -21,6 +21,23 @@ class TestRootEndpoint:
         assert response.status_code == 200
         assert "message" in response.json()
 
+    def test_cors_preflight_allows_patch_and_is_cacheable(self, client):
+        """Test preflight allows the methods the API serves and sets a long max-age."""
+        response = client.options(
+            "/jobs",
+            headers={"Origin": "http://localhost:3000", "Access-Control-Request-Method": "PATCH"},
+        )
+        assert response.status_code == 200
+        assert "PATCH" in response.headers["access-control-allow-methods"]
+        assert response.headers["access-control-max-age"] == "7200"
+
+    def test_metrics_reports_db_pool(self, client):
+        """Test metrics endpoint exposes connection pool saturation."""
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        pool = response.json()["db_pool"]
+        assert {"size", "checked_out", "overflow", "checked_in", "status"} <= pool.keys()
+
 
 class TestUploadEndpoints:
     """Tests for /upload endpoints."""
@@ -55,6 +72,16 @@ class TestUploadEndpoints:
         assert response.status_code == 400
         assert "PDF" in response.json()["detail"]
 
+    def test_upload_pdf_bad_magic_bytes(self, client):
+        """Test upload labelled as PDF is rejected by content before reaching S3."""
+        with patch("api.routers.upload.upload_fileobj_to_s3_async") as mock_upload:
+            files = {"file": ("test.pdf", b"<html>not a pdf</html>", "application/pdf")}
+            response = client.post("/upload/pdf", files=files)
+
+            assert response.status_code == 400
+            assert "PDF" in response.json()["detail"]
+            mock_upload.assert_not_called()
+
     def test_upload_pdf_s3_failure(self, client):
         """Test upload fails when S3 upload fails."""
         async def mock_upload(file_obj, filename, content_type):
@@ -134,10 +161,10 @@ class TestJobsEndpoints:
 
     def test_get_job_tex_awaiting_segmentation(self, client, sample_job_with_tex):
         """Test getting TeX for job awaiting segmentation."""
-        async def mock_download(key):
-            return b"\\documentclass{article}"
+        async def mock_stream(key):
+            return iter([b"\\documentclass", b"{article}"])
         
-        with patch("api.routers.jobs.download_from_s3_async", side_effect=mock_download):
+        with patch("api.routers.jobs.stream_from_s3_async", side_effect=mock_stream):
             response = client.get(f"/jobs/{sample_job_with_tex.id}/tex")
             
             assert response.status_code == 200
@@ -151,24 +178,113 @@ class TestJobsEndpoints:
 
     def test_get_job_tex_completed(self, client, sample_completed_job):
         """Test getting TeX for completed job."""
-        async def mock_download(key):
-            return b"\\documentclass{article}"
+        async def mock_stream(key):
+            return iter([b"\\documentclass", b"{article}"])
         
-        with patch("api.routers.jobs.download_from_s3_async", side_effect=mock_download):
+        with patch("api.routers.jobs.stream_from_s3_async", side_effect=mock_stream):
             response = client.get(f"/jobs/{sample_completed_job.id}/tex")
             
             assert response.status_code == 200
 
+    def test_get_job_tex_download_filename(self, client, sample_completed_job, db_session):
+        """Test only the trailing .pdf is stripped when naming the download."""
+        sample_completed_job.input_pdf_filename = "notes.pdf.scan.pdf"
+        db_session.commit()
+
+        async def mock_stream(key):
+            return iter([b"\\documentclass"])
+
+        with patch("api.routers.jobs.stream_from_s3_async", side_effect=mock_stream):
+            response = client.get(f"/jobs/{sample_completed_job.id}/tex")
+
+            assert response.headers["content-disposition"] == 'attachment; filename="notes.pdf.scan_final_tex.tex"'
+
     def test_get_job_pdf(self, client, sample_completed_job):
         """Test getting PDF for completed job."""
-        async def mock_download(key):
-            return b"%PDF-1.4"
+        async def mock_stream(key):
+            return iter([b"%PDF-", b"1.4"])
         
-        with patch("api.routers.jobs.download_from_s3_async", side_effect=mock_download):
+        with patch("api.routers.jobs.stream_from_s3_async", side_effect=mock_stream):
             response = client.get(f"/jobs/{sample_completed_job.id}/pdf")
             
             assert response.status_code == 200
             assert response.headers["content-type"] == "application/pdf"
+            assert response.content == b"%PDF-1.4"
+
+    def test_get_job_pdf_redirects_to_presigned_url(self, client, sample_completed_job):
+        """Test the PDF endpoint redirects to S3 when a presigned URL is available."""
+        with patch("api.routers.jobs.get_s3_presigned_url", return_value="https://s3.example.com/final.pdf?sig") as mock_presign:
+            response = client.get(f"/jobs/{sample_completed_job.id}/pdf", follow_redirects=False)
+            
+            assert response.status_code == 307
+            assert response.headers["location"] == "https://s3.example.com/final.pdf?sig"
+            assert mock_presign.call_args.kwargs["response_content_type"] == "application/pdf"
+            assert mock_presign.call_args.kwargs["response_content_disposition"].startswith("inline;")
+
+    def test_get_job_pdf_not_modified(self, client, sample_completed_job, db_session):
+        """Test a matching If-None-Match returns 304 without streaming when the PDF would be served directly."""
+        sample_completed_job.final_pdf_etag = "abc123"
+        db_session.commit()
+
+        with patch("api.routers.jobs.get_s3_presigned_url", return_value=None), \
+             patch("api.routers.jobs.stream_from_s3_async") as mock_stream:
+            response = client.get(
+                f"/jobs/{sample_completed_job.id}/pdf",
+                headers={"If-None-Match": 'W/"other", "abc123"'},
+                follow_redirects=False,
+            )
+
+            assert response.status_code == 304
+            assert response.headers["etag"] == '"abc123"'
+            mock_stream.assert_not_called()
+
+    def test_get_job_pdf_stream_sets_cache_headers(self, client, sample_completed_job, db_session):
+        """Test the streamed PDF carries ETag and Cache-Control."""
+        sample_completed_job.final_pdf_etag = "abc123"
+        db_session.commit()
+
+        async def mock_stream(key):
+            return iter([b"%PDF-1.4"])
+
+        with patch("api.routers.jobs.get_s3_presigned_url", return_value=None), \
+             patch("api.routers.jobs.stream_from_s3_async", side_effect=mock_stream):
+            response = client.get(f"/jobs/{sample_completed_job.id}/pdf", headers={"If-None-Match": '"stale"'})
+
+            assert response.status_code == 200
+            assert response.headers["etag"] == '"abc123"'
+            assert response.headers["cache-control"] == "private, no-cache"
+
+    def test_get_job_pdf_conditional_request_gets_fresh_redirect(self, client, sample_completed_job, db_session):
+        """Test If-None-Match never yields a 304 for a redirect, which would make the client reuse an old presigned URL."""
+        sample_completed_job.final_pdf_etag = "abc123"
+        db_session.commit()
+
+        with patch("api.routers.jobs.get_s3_presigned_url", return_value="https://s3.example.com/final.pdf?new-sig") as mock_presign:
+            response = client.get(
+                f"/jobs/{sample_completed_job.id}/pdf",
+                headers={"If-None-Match": '"abc123"'},
+                follow_redirects=False,
+            )
+
+            assert response.status_code == 307
+            assert response.headers["location"] == "https://s3.example.com/final.pdf?new-sig"
+            assert mock_presign.call_args.kwargs["version"] == "abc123"
+            assert "etag" not in response.headers
+            assert response.headers["cache-control"] == "no-store"
+
+    def test_get_job_tex_redirect_opt_in(self, client, sample_completed_job):
+        """Test the TeX endpoint only redirects when asked to."""
+        async def mock_stream(key):
+            return iter([b"\\documentclass{article}"])
+        
+        with patch("api.routers.jobs.get_s3_presigned_url", return_value="https://s3.example.com/final.tex?sig"), \
+             patch("api.routers.jobs.stream_from_s3_async", side_effect=mock_stream):
+            redirected = client.get(f"/jobs/{sample_completed_job.id}/tex?redirect=true", follow_redirects=False)
+            streamed = client.get(f"/jobs/{sample_completed_job.id}/tex", follow_redirects=False)
+            
+            assert redirected.status_code == 307
+            assert redirected.headers["location"] == "https://s3.example.com/final.tex?sig"
+            assert streamed.status_code == 200
 
     def test_get_job_pdf_not_completed(self, client, sample_job_with_tex):
         """Test getting PDF when job not completed."""
@@ -178,8 +294,8 @@ class TestJobsEndpoints:
 
     def test_get_page_images(self, client, sample_job_with_tex, sample_page_images):
         """Test getting page images."""
-        with patch("api.routers.jobs.get_s3_presigned_url") as mock_presign:
-            mock_presign.return_value = "https://s3.example.com/presigned"
+        with patch("api.routers.jobs.get_presigned_urls_for_job") as mock_presign:
+            mock_presign.return_value = {p.s3_path: "https://s3.example.com/presigned" for p in sample_page_images}
             
             response = client.get(f"/jobs/{sample_job_with_tex.id}/pages")
             
@@ -234,6 +350,22 @@ class TestSegmentationEndpoints:
         assert len(data) == 1
         assert data[0]["label"] == "DIAGRAM-1"
 
+    def test_create_segmentations_returns_generated_ids(self, client, sample_job_with_tex, db_session):
+        """Test bulk insert returns every row with its generated id and marks the job complete."""
+        segmentations = [
+            {"pageNumber": i, "x": 0.1, "y": 0.1, "width": 0.2, "height": 0.2, "label": f"DIAGRAM-{i + 1}"}
+            for i in range(3)
+        ]
+        response = client.post(f"/jobs/{sample_job_with_tex.id}/segmentations", json=segmentations)
+
+        assert response.status_code == 201
+        data = response.json()
+        assert [d["label"] for d in data] == ["DIAGRAM-1", "DIAGRAM-2", "DIAGRAM-3"]
+        assert len({d["id"] for d in data}) == 3
+        assert all(d["created_at"] for d in data)
+        db_session.refresh(sample_job_with_tex)
+        assert sample_job_with_tex.status == models.JobStatus.SEGMENTATION_COMPLETE
+
     def test_create_segmentations_invalid_bounds(self, client, sample_job_with_tex):
         """Test creating segmentation with invalid bounds."""
         segmentations = [
@@ -289,6 +421,27 @@ class TestCompilationEndpoints:
         
         assert response.status_code == 400
 
+    def test_trigger_compilation_enqueues_once(self, client, sample_job_with_tex, db_session):
+        """Test a repeated trigger is rejected and does not enqueue a second task."""
+        with patch("api.routers.jobs.compile_final_document") as mock_task:
+            mock_task.delay = MagicMock()
+
+            first = client.post(f"/jobs/{sample_job_with_tex.id}/compile")
+            second = client.post(f"/jobs/{sample_job_with_tex.id}/compile")
+
+            assert first.status_code == 200
+            assert first.json()["status"] == "compilation_pending"
+            assert second.status_code == 400
+            mock_task.delay.assert_called_once_with(str(sample_job_with_tex.id))
+        db_session.refresh(sample_job_with_tex)
+        assert sample_job_with_tex.status == models.JobStatus.COMPILATION_PENDING
+
+    def test_trigger_compilation_not_found(self, client):
+        """Test triggering compilation for a non-existent job."""
+        response = client.post(f"/jobs/{uuid.uuid4()}/compile")
+
+        assert response.status_code == 404
+
 
 class TestPreviewEndpoints:
     """Tests for preview endpoints."""
@@ -518,6 +671,31 @@ class TestEnhancementEndpoints:
                         assert data["label"] == "DIAGRAM-1"
                         assert data["segmentation_id"] == sample_segmentations[0].id
 
+    def test_enhance_twice_returns_fresh_urls(self, client, sample_job_with_tex, sample_page_images, sample_image_bytes, mock_s3_client):
+        """Test re-enhancing a label signs new URLs for the crops it overwrote."""
+        async def mock_download(key):
+            return sample_image_bytes
+        
+        async def mock_upload(content, s3_key, content_type):
+            return s3_key
+        
+        async def mock_enhance(image_bytes, description, context=None):
+            return image_bytes
+        
+        signed = iter(f"https://s3.example.com/url-{n}" for n in range(10))
+        mock_s3_client.generate_presigned_url.side_effect = lambda *args, **kwargs: next(signed)
+        
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"), \
+             patch("api.routers.jobs.download_from_s3_async", side_effect=mock_download), \
+             patch("api.routers.jobs.upload_content_to_s3_async", side_effect=mock_upload), \
+             patch("api.routers.jobs.enhance_image", side_effect=mock_enhance):
+            body = {"label": "DIAGRAM-1", "page_number": 0, "x": 0.1, "y": 0.1, "width": 0.2, "height": 0.2}
+            first = client.post(f"/jobs/{sample_job_with_tex.id}/enhance", json=body).json()
+            second = client.post(f"/jobs/{sample_job_with_tex.id}/enhance", json=body).json()
+        
+        assert second["original_url"] != first["original_url"]
+        assert second["enhanced_url"] != first["enhanced_url"]
+
     def test_enhance_page_not_found(self, client, sample_job_with_tex):
         """Test enhancement when page image doesn't exist."""
         response = client.post(
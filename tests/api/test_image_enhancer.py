@@ -67,9 +67,9 @@ class TestOpenAIEnhancer:
         mock_client = MagicMock()
         mock_result = MagicMock()
         mock_result.data = [MagicMock(b64_json=base64.b64encode(b"enhanced").decode())]
-        mock_client.images.edit.return_value = mock_result
+        mock_client.images.edit = AsyncMock(return_value=mock_result)
         
-        with patch("openai.OpenAI", return_value=mock_client):
+        with patch("api.services.image_enhancer.AsyncOpenAI", return_value=mock_client):
             enhancer = OpenAIEnhancer(api_key="test-key")
             result = await enhancer.enhance(b"original", "A diagram")
             
@@ -82,9 +82,9 @@ class TestOpenAIEnhancer:
         mock_client = MagicMock()
         mock_result = MagicMock()
         mock_result.data = [MagicMock(b64_json=base64.b64encode(b"enhanced").decode())]
-        mock_client.images.edit.return_value = mock_result
+        mock_client.images.edit = AsyncMock(return_value=mock_result)
         
-        with patch("openai.OpenAI", return_value=mock_client):
+        with patch("api.services.image_enhancer.AsyncOpenAI", return_value=mock_client):
             enhancer = OpenAIEnhancer(api_key="test-key")
             await enhancer.enhance(b"original", "A bar chart showing sales")
             
@@ -92,6 +92,22 @@ class TestOpenAIEnhancer:
             prompt = call_kwargs.kwargs.get("prompt", "")
             assert "bar chart showing sales" in prompt
 
+    @pytest.mark.asyncio
+    async def test_enhance_appends_additional_context(self):
+        """Test enhance appends additional context to the prompt."""
+        mock_client = MagicMock()
+        mock_result = MagicMock()
+        mock_result.data = [MagicMock(b64_json=base64.b64encode(b"enhanced").decode())]
+        mock_client.images.edit = AsyncMock(return_value=mock_result)
+        
+        with patch("api.services.image_enhancer.AsyncOpenAI", return_value=mock_client):
+            enhancer = OpenAIEnhancer(api_key="test-key")
+            await enhancer.enhance(b"original", "A {curly} diagram", "Use dashed axes")
+            
+            prompt = mock_client.images.edit.call_args.kwargs["prompt"]
+            assert "Description: A {curly} diagram" in prompt
+            assert prompt.endswith("Additional context: Use dashed axes")
+
 
 class TestGeminiEnhancer:
     """Tests for GeminiEnhancer."""
@@ -136,14 +152,33 @@ class TestGeminiEnhancer:
         mock_response = MagicMock()
         mock_response.candidates = [MagicMock()]
         mock_response.candidates[0].content.parts = [mock_part]
-        mock_client.models.generate_content.return_value = mock_response
+        mock_client.aio.models.generate_content = AsyncMock(return_value=mock_response)
         
         with patch("google.genai.Client", return_value=mock_client):
             enhancer = GeminiEnhancer(api_key="test-key")
             result = await enhancer.enhance(test_image_bytes, "A diagram")
             
             assert result == b"enhanced image data"
-            mock_client.models.generate_content.assert_called_once()
+            mock_client.aio.models.generate_content.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_enhance_passes_raw_image_bytes(self):
+        """Test enhance forwards the original bytes without decoding them."""
+        mock_client = MagicMock()
+        mock_part = MagicMock()
+        mock_part.inline_data.data = b"enhanced image data"
+        mock_response = MagicMock()
+        mock_response.candidates = [MagicMock()]
+        mock_response.candidates[0].content.parts = [mock_part]
+        mock_client.aio.models.generate_content = AsyncMock(return_value=mock_response)
+        
+        with patch("google.genai.Client", return_value=mock_client):
+            enhancer = GeminiEnhancer(api_key="test-key")
+            await enhancer.enhance(b"not-a-decodable-png", "A diagram")
+            
+            contents = mock_client.aio.models.generate_content.call_args.kwargs["contents"]
+            assert contents[1].inline_data.data == b"not-a-decodable-png"
+            assert contents[1].inline_data.mime_type == "image/png"
 
 
 class TestGetImageEnhancer:
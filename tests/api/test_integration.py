@@ -78,10 +78,10 @@ class TestJobWorkflow:
 
     def test_completed_job_file_access(self, client, sample_completed_job):
         """Test accessing files for completed job."""
-        async def mock_download(key):
-            return b"file content"
+        async def mock_stream(key):
+            return iter([b"file content"])
         
-        with patch("api.routers.jobs.download_from_s3_async", side_effect=mock_download):
+        with patch("api.routers.jobs.stream_from_s3_async", side_effect=mock_stream):
             tex_response = client.get(f"/jobs/{sample_completed_job.id}/tex")
             assert tex_response.status_code == 200
             
@@ -105,10 +105,10 @@ class TestErrorHandling:
 
     def test_s3_failure_during_download(self, client, sample_completed_job):
         """Test handling S3 failure during download."""
-        with patch("api.routers.jobs.download_from_s3_async") as mock_download:
-            async def mock_async_download(key):
+        with patch("api.routers.jobs.stream_from_s3_async") as mock_stream:
+            async def mock_async_stream(key):
                 return None
-            mock_download.side_effect = mock_async_download
+            mock_stream.side_effect = mock_async_stream
             
             response = client.get(f"/jobs/{sample_completed_job.id}/tex")
             
@@ -3,6 +3,7 @@ Tests for api/s3_utils.py - S3 utility functions.
 """
 
 import io
+import uuid
 from unittest.mock import MagicMock, patch, PropertyMock
 
 import pytest
@@ -32,6 +33,68 @@ class TestIsBucketConfigured:
             assert _is_bucket_configured() is True
 
 
+class TestRetryS3Call:
+    """Tests for retry_s3_call function."""
+
+    def test_retries_transient_errors_with_backoff(self):
+        """Test throttling errors are retried with exponential backoff."""
+        from api.s3_utils import retry_s3_call
+        
+        slow_down = ClientError({"Error": {"Code": "SlowDown"}}, "PutObject")
+        fn = MagicMock(side_effect=[slow_down, slow_down, "ok"])
+        with patch("api.s3_utils.time.sleep") as mock_sleep:
+            assert retry_s3_call(fn, Key="k") == "ok"
+        
+        assert fn.call_count == 3
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [1, 2]
+
+    def test_does_not_retry_permanent_errors(self):
+        """Test non-transient errors such as NoSuchKey are raised immediately."""
+        from api.s3_utils import retry_s3_call
+        
+        fn = MagicMock(side_effect=ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject"))
+        with patch("api.s3_utils.time.sleep") as mock_sleep:
+            with pytest.raises(ClientError):
+                retry_s3_call(fn)
+        
+        assert fn.call_count == 1
+        mock_sleep.assert_not_called()
+
+    def test_upload_failed_error_retried_only_when_wrapped_error_is_transient(self):
+        """Test S3UploadFailedError is classified by the ClientError it wraps."""
+        from boto3.exceptions import S3UploadFailedError
+        from api.s3_utils import _is_transient_s3_error
+
+        def wrap(code):
+            try:
+                raise ClientError({"Error": {"Code": code}}, "PutObject")
+            except ClientError as e:
+                try:
+                    raise S3UploadFailedError(f"Failed to upload f to b/k: {e}")
+                except S3UploadFailedError as wrapped:
+                    return wrapped
+
+        assert _is_transient_s3_error(wrap("SlowDown")) is True
+        assert _is_transient_s3_error(wrap("AccessDenied")) is False
+        assert _is_transient_s3_error(S3UploadFailedError(
+            "Failed to upload f to b/k: An error occurred (NoSuchBucket) when calling the PutObject operation"
+        )) is False
+        assert _is_transient_s3_error(S3UploadFailedError(
+            "Failed to upload f to b/k: An error occurred (503) when calling the PutObject operation"
+        )) is True
+
+    def test_raises_after_max_attempts(self):
+        """Test the last transient error is raised once attempts run out."""
+        from api.s3_utils import retry_s3_call, S3_MAX_ATTEMPTS
+        
+        fn = MagicMock(side_effect=ClientError({"Error": {"Code": "503"}}, "GetObject"))
+        with patch("api.s3_utils.time.sleep"):
+            with pytest.raises(ClientError):
+                retry_s3_call(fn)
+        
+        assert fn.call_count == S3_MAX_ATTEMPTS
+
+
 class TestUploadToS3:
     """Tests for upload_to_s3 function."""
 
@@ -158,6 +221,23 @@ class TestDownloadFromS3:
             
             assert result == b"file content"
 
+    def test_download_decompresses_gzip_encoded_object(self, mock_s3_client):
+        """Test gzip-encoded objects are returned decompressed."""
+        import gzip
+
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import download_from_s3
+            
+            mock_body = MagicMock()
+            mock_body.read.return_value = gzip.compress(b"\\documentclass{article}")
+            mock_body.__enter__ = MagicMock(return_value=mock_body)
+            mock_body.__exit__ = MagicMock(return_value=False)
+            mock_s3_client.get_object.return_value = {"Body": mock_body, "ContentEncoding": "gzip"}
+            
+            result = download_from_s3("test/key.tex")
+            
+            assert result == b"\\documentclass{article}"
+
     def test_download_key_not_found(self, mock_s3_client):
         """Test handles NoSuchKey error."""
         with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
@@ -196,6 +276,95 @@ class TestDownloadFromS3:
             assert result is None
 
 
+class TestStreamFromS3:
+    """Tests for stream_from_s3 function."""
+
+    def test_stream_yields_chunks(self, mock_s3_client):
+        """Test object body is yielded chunk by chunk."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import stream_from_s3
+            
+            mock_body = MagicMock()
+            mock_body.iter_chunks.return_value = iter([b"abc", b"def"])
+            mock_body.__enter__ = MagicMock(return_value=mock_body)
+            mock_body.__exit__ = MagicMock(return_value=False)
+            mock_s3_client.get_object.return_value = {"Body": mock_body}
+            
+            assert list(stream_from_s3("test/key.tex", chunk_size=3)) == [b"abc", b"def"]
+            mock_body.iter_chunks.assert_called_once_with(3)
+
+    def test_stream_decompresses_gzip(self, mock_s3_client):
+        """Test gzip-encoded objects are decompressed while streaming."""
+        import gzip
+
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import stream_from_s3
+            
+            payload = gzip.compress(b"line one\nline two\n" * 50)
+            mock_body = MagicMock()
+            mock_body.iter_chunks.return_value = iter([payload[:10], payload[10:]])
+            mock_body.__enter__ = MagicMock(return_value=mock_body)
+            mock_body.__exit__ = MagicMock(return_value=False)
+            mock_s3_client.get_object.return_value = {"Body": mock_body, "ContentEncoding": "gzip"}
+            
+            assert b"".join(stream_from_s3("test/key.tex")) == b"line one\nline two\n" * 50
+
+    def test_stream_returns_none_on_missing_key(self, mock_s3_client):
+        """Test returns None when the object does not exist."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import stream_from_s3
+            
+            mock_s3_client.get_object.side_effect = ClientError(
+                {"Error": {"Code": "NoSuchKey", "Message": "Missing"}},
+                "get_object"
+            )
+            
+            assert stream_from_s3("missing.tex") is None
+
+
+class TestDownloadFileFromS3:
+    """Tests for download_file_from_s3 function."""
+
+    def test_download_file_success(self, mock_s3_client, temp_dir):
+        """Test object is downloaded directly to the local path."""
+        import os
+
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import download_file_from_s3, S3_TRANSFER_CONFIG
+            
+            local_path = os.path.join(temp_dir, "input.pdf")
+            result = download_file_from_s3("uploads/pdfs/input.pdf", local_path)
+            
+            assert result is True
+            mock_s3_client.download_file.assert_called_once_with(
+                Bucket="test-bucket", Key="uploads/pdfs/input.pdf", Filename=local_path,
+                Config=S3_TRANSFER_CONFIG
+            )
+
+    def test_download_file_handles_client_error(self, mock_s3_client, temp_dir):
+        """Test returns False on ClientError."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import download_file_from_s3
+            
+            mock_s3_client.download_file.side_effect = ClientError(
+                {"Error": {"Code": "404", "Message": "Not Found"}},
+                "HeadObject"
+            )
+            
+            assert download_file_from_s3("missing.pdf", f"{temp_dir}/x.pdf") is False
+
+    def test_download_file_uses_crt_manager_when_enabled(self, mock_s3_client, temp_dir):
+        """Test the CRT transfer manager is used when available."""
+        mock_manager = MagicMock()
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"), \
+             patch("api.s3_utils._get_crt_transfer_manager", return_value=mock_manager):
+            from api.s3_utils import download_file_from_s3
+            
+            assert download_file_from_s3("key.pdf", f"{temp_dir}/x.pdf") is True
+            mock_manager.download.assert_called_once_with("test-bucket", "key.pdf", f"{temp_dir}/x.pdf")
+            mock_s3_client.download_file.assert_not_called()
+
+
 class TestGetS3PresignedUrl:
     """Tests for get_s3_presigned_url function."""
 
@@ -220,6 +389,21 @@ class TestGetS3PresignedUrl:
             call_args = mock_s3_client.generate_presigned_url.call_args
             assert call_args[1]["ExpiresIn"] == 7200
 
+    def test_generate_presigned_url_response_headers(self, mock_s3_client):
+        """Test response header overrides are signed into the URL parameters."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import get_s3_presigned_url
+            
+            get_s3_presigned_url(
+                "outputs/final.pdf",
+                response_content_disposition='inline; filename="a.pdf"',
+                response_content_type="application/pdf",
+            )
+            
+            params = mock_s3_client.generate_presigned_url.call_args[1]["Params"]
+            assert params["ResponseContentDisposition"] == 'inline; filename="a.pdf"'
+            assert params["ResponseContentType"] == "application/pdf"
+
     def test_generate_presigned_url_handles_error(self, mock_s3_client):
         """Test handles ClientError during URL generation."""
         with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
@@ -231,9 +415,166 @@ class TestGetS3PresignedUrl:
             )
             
             result = get_s3_presigned_url("test/key.txt")
-            
+
             assert result is None
 
+    def test_reuses_cached_url_within_half_lifetime(self, mock_s3_client):
+        """Test repeated calls reuse one signature until half the TTL has elapsed."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"), \
+             patch("api.s3_utils.time.monotonic", side_effect=[1000.0, 1500.0, 2900.0]):
+            from api.s3_utils import get_s3_presigned_url
+
+            get_s3_presigned_url("test/key.txt")
+            get_s3_presigned_url("test/key.txt")
+            assert mock_s3_client.generate_presigned_url.call_count == 1
+
+            get_s3_presigned_url("test/key.txt")
+            assert mock_s3_client.generate_presigned_url.call_count == 2
+
+    def test_new_version_or_no_cache_signs_again(self, mock_s3_client):
+        """Test a changed version misses the cache and cache=False always signs a fresh URL."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import get_s3_presigned_url
+
+            get_s3_presigned_url("outputs/final.pdf", version="etag1")
+            get_s3_presigned_url("outputs/final.pdf", version="etag1")
+            assert mock_s3_client.generate_presigned_url.call_count == 1
+
+            get_s3_presigned_url("outputs/final.pdf", version="etag2")
+            assert mock_s3_client.generate_presigned_url.call_count == 2
+
+            get_s3_presigned_url("outputs/final.tex", cache=False)
+            get_s3_presigned_url("outputs/final.tex", cache=False)
+            assert mock_s3_client.generate_presigned_url.call_count == 4
+
+    def test_does_not_cache_failures(self, mock_s3_client):
+        """Test a failed signing attempt is retried on the next call."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import get_s3_presigned_url
+
+            mock_s3_client.generate_presigned_url.return_value = None
+            assert get_s3_presigned_url("test/key.txt") is None
+
+            mock_s3_client.generate_presigned_url.return_value = "https://s3.example.com/ok"
+            assert get_s3_presigned_url("test/key.txt") == "https://s3.example.com/ok"
+
+
+class TestGetPresignedUrlsForJob:
+    """Tests for get_presigned_urls_for_job function."""
+
+    def test_reuses_cached_batch(self, mock_s3_client):
+        """Test repeated calls for the same job reuse the signed batch."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import get_presigned_urls_for_job
+
+            job_id = uuid.uuid4()
+            keys = [f"pages/{job_id}/page_0.png", f"pages/{job_id}/page_1.png"]
+
+            first = get_presigned_urls_for_job(job_id, keys)
+            second = get_presigned_urls_for_job(job_id, keys)
+
+            assert first == second
+            assert set(first) == set(keys)
+            assert mock_s3_client.generate_presigned_url.call_count == 2
+
+    def test_resigns_when_keys_change(self, mock_s3_client):
+        """Test a changed key set bypasses the cached batch."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import get_presigned_urls_for_job
+
+            job_id = uuid.uuid4()
+            get_presigned_urls_for_job(job_id, ["a.png"])
+            result = get_presigned_urls_for_job(job_id, ["a.png", "b.png"])
+
+            assert set(result) == {"a.png", "b.png"}
+            assert mock_s3_client.generate_presigned_url.call_count == 3
+
+    def test_returns_none_on_signing_failure(self, mock_s3_client):
+        """Test returns None when any URL cannot be generated."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import get_presigned_urls_for_job
+
+            mock_s3_client.generate_presigned_url.return_value = None
+
+            assert get_presigned_urls_for_job(uuid.uuid4(), ["a.png"]) is None
+
+
+class TestPresignBatch:
+    """Tests for _presign_batch SigV4 fast path."""
+
+    def test_batch_urls_match_botocore(self):
+        """Test batch-signed URLs are identical to botocore's per-key URLs."""
+        import datetime
+        import boto3
+        from botocore.config import Config
+
+        client = boto3.client(
+            "s3",
+            region_name="eu-west-1",
+            aws_access_key_id="AKIDEXAMPLE",
+            aws_secret_access_key="secret/key",
+            aws_session_token="token+/=",
+            config=Config(signature_version="s3v4"),
+        )
+        keys = ("pages/job/page_0.png", "pages/job/a b+c/\u00fc~x.png", "pages/job/page_2.png")
+        fixed_now = datetime.datetime(2026, 1, 1, 12, 0, 0)
+
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"), \
+             patch("api.s3_utils.s3_client", client), \
+             patch("botocore.auth.get_current_datetime", return_value=fixed_now):
+            from api.s3_utils import _presign_batch
+
+            result = _presign_batch(keys, 3600)
+            expected = {
+                key: client.generate_presigned_url(
+                    "get_object", Params={"Bucket": "test-bucket", "Key": key}, ExpiresIn=3600
+                )
+                for key in keys
+            }
+
+        assert result == expected
+
+    def test_falls_back_to_per_key_signing(self, mock_s3_client):
+        """Test non-SigV4 seed URLs fall back to signing each key."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import _presign_batch
+
+            mock_s3_client.generate_presigned_url.return_value = "https://s3.example.com/test-url"
+
+            result = _presign_batch(("a.png", "b.png", "c.png"), 3600)
+
+            assert len(result) == 3
+            assert mock_s3_client.generate_presigned_url.call_count == 3
+
+
+class TestCopyS3Object:
+    """Tests for copy_s3_object function."""
+
+    def test_copy_success(self, mock_s3_client):
+        """Test server-side copy within the bucket."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import copy_s3_object
+
+            result = copy_s3_object("outputs/initial_tex/a.tex", "outputs/final_tex/a.tex")
+
+            assert result == "outputs/final_tex/a.tex"
+            mock_s3_client.copy_object.assert_called_once_with(
+                Bucket="test-bucket",
+                Key="outputs/final_tex/a.tex",
+                CopySource={"Bucket": "test-bucket", "Key": "outputs/initial_tex/a.tex"},
+            )
+
+    def test_copy_handles_error(self, mock_s3_client):
+        """Test returns None on a non-retryable ClientError."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import copy_s3_object
+
+            mock_s3_client.copy_object.side_effect = ClientError(
+                {"Error": {"Code": "NoSuchKey", "Message": "missing"}}, "CopyObject"
+            )
+
+            assert copy_s3_object("missing.tex", "dest.tex") is None
+
 
 class TestUploadContentToS3:
     """Tests for upload_content_to_s3 function."""
@@ -257,6 +598,30 @@ class TestUploadContentToS3:
             
             assert result == "test/key.txt"
 
+    def test_upload_text_content_is_gzipped(self, mock_s3_client):
+        """Test textual content is gzip-compressed with ContentEncoding set."""
+        import gzip
+
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import upload_content_to_s3
+            
+            upload_content_to_s3(b"tex " * 100, "test/key.tex", "text/plain")
+            
+            args, kwargs = mock_s3_client.upload_fileobj.call_args
+            assert gzip.decompress(args[0].getvalue()) == b"tex " * 100
+            assert kwargs["ExtraArgs"]["ContentEncoding"] == "gzip"
+
+    def test_upload_binary_content_not_gzipped(self, mock_s3_client):
+        """Test binary content is uploaded as-is."""
+        with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
+            from api.s3_utils import upload_content_to_s3
+            
+            upload_content_to_s3(b"\x89PNG", "test/key.png", "image/png")
+            
+            args, kwargs = mock_s3_client.upload_fileobj.call_args
+            assert args[0].getvalue() == b"\x89PNG"
+            assert "ContentEncoding" not in kwargs["ExtraArgs"]
+
     def test_upload_content_handles_client_error(self, mock_s3_client):
         """Test handles ClientError during upload."""
         with patch("api.s3_utils.S3_BUCKET_NAME", "test-bucket"):
@@ -256,6 +256,21 @@ class TestSegmentationSchemas:
         assert seg.id == 1
         assert seg.created_at == now
 
+    def test_segmentation_list_adapter_dumps_alias(self):
+        """Test SegmentationListAdapter serializes with the pageNumber alias."""
+        seg = schemas.Segmentation(
+            id=1,
+            job_id=uuid.uuid4(),
+            pageNumber=2,
+            x=0.1,
+            y=0.2,
+            width=0.3,
+            height=0.4,
+            created_at=datetime.now(timezone.utc),
+        )
+        payload = schemas.SegmentationListAdapter.dump_json([seg], by_alias=True)
+        assert b'"pageNumber":2' in payload
+
 
 class TestSegmentationTaskSchemas:
     """Tests for SegmentationTask-related schemas."""
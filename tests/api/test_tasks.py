@@ -11,6 +11,18 @@ import pytest
 from api import models
 from api.tasks import (
     parse_descriptions, 
+    segmentation_task_sort_key,
+    read_log_tail,
+    content_etag,
+    load_segmentations_with_pages,
+    download_all_from_s3,
+    download_page_image,
+    crop_page_segmentations,
+    crop_all_pages,
+    merge_page_latex,
+    get_latex_from_image_cached,
+    substitute_placeholders,
+    write_substituted_tex,
     process_handwriting_conversion, 
     compile_final_document,
     compile_latex_preview,
@@ -95,6 +107,294 @@ and should be captured.
         assert "multiple lines" in result["DIAGRAM-1"]
 
 
+class TestSegmentationTaskSortKey:
+    """Tests for segmentation_task_sort_key function."""
+
+    def test_orders_non_diagrams_first_then_by_name(self):
+        """Test DIAGRAM placeholders sort after all others."""
+        mapping = {"DIAGRAM-2": "b", "TABLE-1": "t", "DIAGRAM-1": "a", "FIGURE-1": "f"}
+        ordered = [name for name, _ in sorted(mapping.items(), key=segmentation_task_sort_key)]
+        assert ordered == ["FIGURE-1", "TABLE-1", "DIAGRAM-1", "DIAGRAM-2"]
+
+
+class TestSubstitutePlaceholders:
+    """Tests for substitute_placeholders function."""
+
+    def test_replaces_whole_labels_only(self):
+        """Test DIAGRAM-1 does not match inside DIAGRAM-10 and unknown labels are kept."""
+        text = "% PLACEHOLDER: DIAGRAM-1\n% PLACEHOLDER: DIAGRAM-10\n% PLACEHOLDER: STRUCTURE-1"
+        
+        result = substitute_placeholders(text, {"DIAGRAM-1": "one", "DIAGRAM-10": "ten"})
+        
+        assert result == "one\nten\n% PLACEHOLDER: STRUCTURE-1"
+
+
+class TestWriteSubstitutedTex:
+    """Tests for write_substituted_tex function."""
+
+    def test_substitutes_across_chunk_boundaries(self, temp_dir):
+        """Test placeholders and multibyte characters split across chunks."""
+        import os
+
+        source = "Temp 20\u00b0C\n% PLACEHOLDER: DIAGRAM-1\nEnd".encode("utf-8")
+        chunks = [source[i:i + 3] for i in range(0, len(source), 3)]
+        output_path = os.path.join(temp_dir, "final.tex")
+
+        write_substituted_tex(chunks, output_path, {"DIAGRAM-1": "\\includegraphics{d1}"})
+
+        with open(output_path, encoding="utf-8") as f:
+            assert f.read() == "Temp 20\u00b0C\n\\includegraphics{d1}\nEnd"
+
+    def test_copies_bytes_unchanged_without_replacements(self, temp_dir):
+        """Test the TeX is written through byte-for-byte when nothing is substituted."""
+        import os
+
+        source = "Temp 20\u00b0C\r\n% PLACEHOLDER: DIAGRAM-1\n".encode("utf-8")
+        output_path = os.path.join(temp_dir, "final.tex")
+
+        write_substituted_tex([source[:7], source[7:]], output_path, {})
+
+        with open(output_path, "rb") as f:
+            assert f.read() == source
+
+
+class TestGetLatexFromImageCached:
+    """Tests for get_latex_from_image_cached function."""
+
+    def test_cache_hit_skips_vlm(self, temp_dir):
+        """Test a cached result is returned without calling the VLM."""
+        import json
+        import os
+
+        image_path = os.path.join(temp_dir, "page_0.jpg")
+        with open(image_path, "wb") as f:
+            f.write(b"image")
+        mock_cache = MagicMock()
+        mock_cache.get.return_value = json.dumps(["\\section{A}", "desc"])
+
+        with patch("api.tasks._get_vlm_cache", return_value=mock_cache), \
+             patch("api.tasks.get_latex_from_image") as mock_vlm:
+            result = get_latex_from_image_cached(image_path, "gpt-4o")
+
+        assert result == ("\\section{A}", "desc")
+        mock_vlm.assert_not_called()
+
+    def test_cache_miss_stores_result(self, temp_dir):
+        """Test a successful VLM result is stored under the image hash, model and prompt version."""
+        import hashlib
+        import os
+        from api.tasks import PROMPT_VERSION
+
+        image_path = os.path.join(temp_dir, "page_0.jpg")
+        with open(image_path, "wb") as f:
+            f.write(b"image")
+        mock_cache = MagicMock()
+        mock_cache.get.return_value = None
+
+        with patch("api.tasks._get_vlm_cache", return_value=mock_cache), \
+             patch("api.tasks.get_latex_from_image", return_value=("\\section{A}", "desc")):
+            result = get_latex_from_image_cached(image_path, "gpt-4o")
+
+        assert result == ("\\section{A}", "desc")
+        key = mock_cache.setex.call_args.args[0]
+        assert key == f"vlm:{hashlib.sha256(b'image').hexdigest()}:gpt-4o:{PROMPT_VERSION}"
+
+
+class TestMergePageLatex:
+    """Tests for merge_page_latex function."""
+
+    def test_single_page_returned_unchanged(self):
+        """Test a single page result is passed through as-is."""
+        result = ("\\documentclass{article}\\begin{document}x\\end{document}", "desc")
+
+        assert merge_page_latex([result]) == result
+
+    def test_merges_bodies_and_renumbers_placeholders(self):
+        """Test page bodies are joined and later placeholders are offset."""
+        page_0 = (
+            "\\documentclass{article}\n\\begin{document}\n% PLACEHOLDER: DIAGRAM-1\n\\end{document}",
+            "Placeholder: DIAGRAM-1\nDescription: First plot.",
+        )
+        page_1 = (
+            "\\documentclass{article}\n\\usepackage{amsmath}\n\\begin{document}\n% PLACEHOLDER: DIAGRAM-1\n\\end{document}",
+            "Placeholder: DIAGRAM-1\nDescription: Second plot.",
+        )
+
+        latex, descriptions = merge_page_latex([page_0, page_1])
+
+        assert latex.count("\\begin{document}") == 1
+        assert latex.count("\\end{document}") == 1
+        assert "\\usepackage{amsmath}" in latex
+        assert latex.index("DIAGRAM-1") < latex.index("\\newpage") < latex.index("DIAGRAM-2")
+        assert parse_descriptions(descriptions) == {"DIAGRAM-1": "First plot.", "DIAGRAM-2": "Second plot."}
+
+
+    def test_adds_each_missing_package_once(self):
+        """Test packages from later pages are appended once and existing ones are not repeated."""
+        pages = [
+            ("\\documentclass{article}\n\\usepackage{amsmath}\n\\begin{document}\nA\n\\end{document}", ""),
+            ("\\documentclass{article}\n  \\usepackage{amsmath}\n\\usepackage{tikz}\n\\begin{document}\nB\n\\end{document}", ""),
+            ("\\documentclass{article}\n\\usepackage{tikz}  \n\\begin{document}\nC\n\\end{document}", ""),
+        ]
+
+        latex, _ = merge_page_latex(pages)
+
+        preamble = latex[:latex.index("\\begin{document}")]
+        assert preamble.count("\\usepackage{amsmath}") == 1
+        assert preamble.count("\\usepackage{tikz}") == 1
+
+class TestCropPageSegmentations:
+    """Tests for crop_page_segmentations function."""
+
+    def test_crops_all_segmentations_from_one_decode(self, temp_dir):
+        """Test each segmentation on a page is cropped and invalid boxes skipped."""
+        import io
+        import os
+        from types import SimpleNamespace
+        from PIL import Image
+
+        buf = io.BytesIO()
+        Image.new("RGB", (100, 50), "white").save(buf, "PNG")
+        segs = [
+            SimpleNamespace(label="DIAGRAM-1", page_number=0, x=0.0, y=0.0, width=0.5, height=0.5),
+            SimpleNamespace(label="DIAGRAM-2", page_number=0, x=0.5, y=0.5, width=0.5, height=0.5),
+            SimpleNamespace(label="DIAGRAM-3", page_number=0, x=1.0, y=0.0, width=0.1, height=0.1),
+        ]
+
+        with patch("api.tasks.Image.open", wraps=Image.open) as mock_open:
+            result = crop_page_segmentations(buf.getvalue(), segs, temp_dir)
+
+        assert mock_open.call_count == 1
+        assert result == {"DIAGRAM-1": "DIAGRAM-1.jpg", "DIAGRAM-2": "DIAGRAM-2.jpg"}
+        with Image.open(os.path.join(temp_dir, "DIAGRAM-1.jpg")) as cropped:
+            assert cropped.format == "JPEG"
+            assert cropped.size == (50, 25)
+
+
+    def test_converts_alpha_page_for_jpeg(self, temp_dir):
+        """Test crops from RGBA page images are converted so they can be saved as JPEG."""
+        import io
+        from types import SimpleNamespace
+        from PIL import Image
+
+        buf = io.BytesIO()
+        Image.new("RGBA", (100, 50), (255, 255, 255, 0)).save(buf, "PNG")
+        segs = [SimpleNamespace(label="DIAGRAM-1", page_number=0, x=0.0, y=0.0, width=0.5, height=0.5)]
+
+        result = crop_page_segmentations(buf.getvalue(), segs, temp_dir)
+
+        assert result == {"DIAGRAM-1": "DIAGRAM-1.jpg"}
+
+
+class TestCropAllPages:
+    """Tests for crop_all_pages function."""
+
+    def test_merges_pages_and_skips_undecodable_page(self, temp_dir):
+        """Test crops from every page are merged and a bad page does not abort the rest."""
+        import io
+        from types import SimpleNamespace
+        from PIL import Image
+
+        buf = io.BytesIO()
+        Image.new("RGB", (100, 50), "white").save(buf, "PNG")
+        pages = [
+            (0, buf.getvalue(), [SimpleNamespace(label="DIAGRAM-1", page_number=0, x=0.0, y=0.0, width=0.5, height=0.5)]),
+            (1, b"not an image", [SimpleNamespace(label="DIAGRAM-2", page_number=1, x=0.0, y=0.0, width=0.5, height=0.5)]),
+            (2, buf.getvalue(), [SimpleNamespace(label="STRUCTURE-1", page_number=2, x=0.5, y=0.5, width=0.5, height=0.5)]),
+        ]
+
+        result = crop_all_pages(pages, temp_dir)
+
+        assert result == {"DIAGRAM-1": "DIAGRAM-1.jpg", "STRUCTURE-1": "STRUCTURE-1.jpg"}
+
+
+class TestDownloadPageImage:
+    """Tests for download_page_image function."""
+
+    def test_repeated_keys_hit_cache(self):
+        """Test a page image is fetched from S3 once and failures are not cached."""
+        key = f"pages/{uuid.uuid4()}/page_0.jpg"
+        missing = f"pages/{uuid.uuid4()}/page_1.jpg"
+        with patch("api.tasks.download_from_s3", side_effect=lambda k: b"img" if k == key else None) as mock_download:
+            assert download_page_image(key) == b"img"
+            assert download_page_image(key) == b"img"
+            assert download_page_image(missing) is None
+            assert download_page_image(missing) is None
+
+        assert [c.args[0] for c in mock_download.call_args_list] == [key, missing, missing]
+
+
+class TestDownloadAllFromS3:
+    """Tests for download_all_from_s3 function."""
+
+    def test_downloads_each_path_once(self):
+        """Test every distinct path is fetched and failures map to None."""
+        contents = {"a.jpg": b"a", "b.jpg": None}
+        with patch('api.tasks.download_from_s3', side_effect=lambda key: contents[key]) as mock_download:
+            result = download_all_from_s3({"a.jpg", "b.jpg"})
+
+        assert result == {"a.jpg": b"a", "b.jpg": None}
+        assert mock_download.call_count == 2
+
+
+class TestContentEtag:
+    """Tests for content_etag function."""
+
+    def test_matches_md5_of_contents(self):
+        """Test the tag is the MD5 of the content."""
+        import hashlib
+
+        content = b"%PDF-1.4" + b"x" * 5000
+
+        assert content_etag(content) == hashlib.md5(content).hexdigest()
+
+
+class TestLoadSegmentationsWithPages:
+    """Tests for load_segmentations_with_pages function."""
+
+    def test_returns_segmentations_and_their_page_paths(self, db_session, sample_job_with_tex, sample_page_images, sample_segmentations):
+        """Test only the pages referenced by segmentations are returned."""
+        segmentations, page_paths = load_segmentations_with_pages(db_session, sample_job_with_tex.id)
+
+        assert sorted(seg.label for seg in segmentations) == ["DIAGRAM-1", "DIAGRAM-2"]
+        assert page_paths == {0: f"pages/{sample_job_with_tex.id}/page_0.png"}
+
+    def test_segmentation_without_page_image_is_kept(self, db_session, sample_job_with_tex, sample_segmentations):
+        """Test segmentations whose page has no image row are still returned."""
+        segmentations, page_paths = load_segmentations_with_pages(db_session, sample_job_with_tex.id)
+
+        assert len(segmentations) == 2
+        assert page_paths == {}
+
+
+class TestReadLogTail:
+    """Tests for read_log_tail function."""
+
+    def test_reads_only_the_tail(self, temp_dir):
+        """Test only the last bytes are returned, starting at a line boundary."""
+        import os
+
+        log_path = os.path.join(temp_dir, "final.log")
+        with open(log_path, "w", encoding="utf-8") as f:
+            f.write("noise line\n" * 1000 + "! Undefined control sequence.\n")
+
+        tail = read_log_tail(log_path, max_bytes=100)
+
+        assert len(tail) <= 100
+        assert tail.startswith("noise line")
+        assert tail.endswith("! Undefined control sequence.\n")
+
+    def test_small_log_read_whole(self, temp_dir):
+        """Test logs smaller than the limit are returned in full."""
+        import os
+
+        log_path = os.path.join(temp_dir, "final.log")
+        with open(log_path, "w", encoding="utf-8") as f:
+            f.write("first\n! Error\n")
+
+        assert read_log_tail(log_path) == "first\n! Error\n"
+
+
 class TestProcessHandwritingConversion:
     """Tests for process_handwriting_conversion task."""
 
@@ -102,18 +402,20 @@ class TestProcessHandwritingConversion:
     def mock_dependencies(self):
         """Mock all external dependencies."""
         with patch("api.tasks.SessionLocal") as mock_session, \
-             patch("api.tasks.download_from_s3") as mock_download, \
+             patch("api.tasks.download_file_from_s3") as mock_download, \
              patch("api.tasks.upload_local_file_to_s3") as mock_upload, \
              patch("api.tasks.s3_client") as mock_s3, \
+             patch("api.tasks.create_transfer_manager") as mock_create_tm, \
              patch("api.tasks.render_pdf_pages_to_images") as mock_render, \
              patch("api.tasks.get_latex_from_image") as mock_vlm, \
+             patch("api.tasks._get_vlm_cache", return_value=None), \
              patch("api.tasks.save_latex_to_file") as mock_save, \
              patch("api.tasks.wrap_latex_fragment") as mock_wrap, \
              patch.object(process_handwriting_conversion, "update_state") as mock_update:
             
             mock_db = MagicMock()
             mock_session.return_value = mock_db
-            mock_download.return_value = b"%PDF-1.4"
+            mock_download.return_value = True
             mock_upload.return_value = "outputs/initial_tex/test.tex"
             mock_render.return_value = ["/tmp/page_0.png"]
             mock_vlm.return_value = ("\\documentclass{article}", "")
@@ -126,6 +428,7 @@ class TestProcessHandwritingConversion:
                 "download": mock_download,
                 "upload": mock_upload,
                 "s3": mock_s3,
+                "transfer_manager": mock_create_tm.return_value,
                 "render": mock_render,
                 "vlm": mock_vlm,
                 "save": mock_save,
@@ -144,12 +447,165 @@ class TestProcessHandwritingConversion:
     def test_task_download_failure(self, mock_dependencies, sample_job):
         """Test task handles download failure."""
         mock_dependencies["db"].query.return_value.filter.return_value.first.return_value = sample_job
-        mock_dependencies["download"].return_value = None
+        mock_dependencies["download"].return_value = False
         
         result = process_handwriting_conversion.run(str(sample_job.id))
         
         assert "failed" in result.lower()
 
+    def test_task_skips_upload_of_existing_page(self, mock_dependencies, sample_job, temp_dir):
+        """Test a page already in S3 with the same size is not uploaded again."""
+        import os
+
+        page_path = os.path.join(temp_dir, "page_0.jpg")
+        with open(page_path, "wb") as f:
+            f.write(b"jpeg-bytes")
+
+        def render(pdf_path, output_dir, on_page=None):
+            on_page(page_path)
+            return [page_path]
+
+        mock_dependencies["db"].query.return_value.filter.return_value.first.return_value = sample_job
+        mock_dependencies["render"].side_effect = render
+        mock_dependencies["s3"].head_object.return_value = {"ContentLength": len(b"jpeg-bytes")}
+
+        process_handwriting_conversion.run(str(sample_job.id))
+
+        mock_dependencies["s3"].head_object.assert_called_once()
+        mock_dependencies["transfer_manager"].upload.assert_not_called()
+
+    def test_task_first_run_uploads_without_head_check(self, mock_dependencies, sample_job, temp_dir):
+        """Test a job without page rows uploads its pages without asking S3 whether they exist."""
+        import os
+
+        page_path = os.path.join(temp_dir, "page_0.jpg")
+        with open(page_path, "wb") as f:
+            f.write(b"jpeg-bytes")
+
+        def render(pdf_path, output_dir, on_page=None):
+            on_page(page_path)
+            return [page_path]
+
+        mock_db = mock_dependencies["db"]
+        mock_db.query.return_value.filter.return_value.first.side_effect = [sample_job, None]
+        mock_dependencies["render"].side_effect = render
+
+        process_handwriting_conversion.run(str(sample_job.id))
+
+        mock_dependencies["s3"].head_object.assert_not_called()
+        mock_dependencies["transfer_manager"].upload.assert_called_once()
+        mock_db.query.return_value.filter.return_value.delete.assert_not_called()
+
+    def test_task_rerun_replaces_page_rows_and_keeps_skipped_images(self, mock_dependencies, sample_job, temp_dir):
+        """Test a re-run deletes the earlier page rows before inserting and never cleans up pages it skipped."""
+        import os
+
+        page_path = os.path.join(temp_dir, "page_0.jpg")
+        with open(page_path, "wb") as f:
+            f.write(b"jpeg-bytes")
+
+        def render(pdf_path, output_dir, on_page=None):
+            on_page(page_path)
+            return [page_path]
+
+        mock_db = mock_dependencies["db"]
+        mock_db.query.return_value.filter.return_value.first.return_value = sample_job
+        mock_dependencies["render"].side_effect = render
+        mock_dependencies["s3"].head_object.return_value = {"ContentLength": len(b"jpeg-bytes")}
+        mock_dependencies["vlm"].return_value = (None, None)
+
+        result = process_handwriting_conversion.run(str(sample_job.id))
+
+        assert "failed" in result.lower()
+        mock_db.query.return_value.filter.return_value.delete.assert_called_once_with(synchronize_session=False)
+        mock_db.bulk_insert_mappings.assert_called_once()
+        mock_dependencies["s3"].delete_objects.assert_not_called()
+
+    def test_task_uploads_pages_through_shared_transfer_manager(self, mock_dependencies, sample_job, temp_dir):
+        """Test missing pages are uploaded via one job-scoped TransferManager that is shut down afterwards."""
+        import os
+        from botocore.exceptions import ClientError
+
+        page_paths = []
+        for n in range(2):
+            page_path = os.path.join(temp_dir, f"page_{n}.jpg")
+            with open(page_path, "wb") as f:
+                f.write(b"jpeg-bytes")
+            page_paths.append(page_path)
+
+        def render(pdf_path, output_dir, on_page=None):
+            for page_path in page_paths:
+                on_page(page_path)
+            return page_paths
+
+        mock_dependencies["db"].query.return_value.filter.return_value.first.return_value = sample_job
+        mock_dependencies["render"].side_effect = render
+        mock_dependencies["s3"].head_object.side_effect = ClientError({"Error": {"Code": "404"}}, "HeadObject")
+
+        process_handwriting_conversion.run(str(sample_job.id))
+
+        manager = mock_dependencies["transfer_manager"]
+        uploaded_keys = sorted(call.args[2] for call in manager.upload.call_args_list)
+        assert uploaded_keys == [f"pages/{sample_job.id}/page_0.jpg", f"pages/{sample_job.id}/page_1.jpg"]
+        assert manager.upload.call_args.kwargs["extra_args"] == {"ContentType": "image/jpeg"}
+        manager.shutdown.assert_called_once()
+
+
+    def test_task_sends_pages_to_vlm_while_rendering(self, mock_dependencies, sample_job, temp_dir):
+        """Test a page reaches the VLM before rendering of the document has finished."""
+        import os
+        import threading
+
+        page_path = os.path.join(temp_dir, "page_0.jpg")
+        with open(page_path, "wb") as f:
+            f.write(b"jpeg-bytes")
+        vlm_called = threading.Event()
+        seen_during_render = []
+
+        def render(pdf_path, output_dir, on_page=None):
+            on_page(page_path)
+            seen_during_render.append(vlm_called.wait(timeout=5))
+            return [page_path]
+
+        mock_dependencies["db"].query.return_value.filter.return_value.first.return_value = sample_job
+        mock_dependencies["render"].side_effect = render
+        mock_dependencies["s3"].head_object.return_value = {"ContentLength": len(b"jpeg-bytes")}
+        mock_dependencies["vlm"].side_effect = lambda *args, **kwargs: vlm_called.set() or ("\\section{A}", "")
+
+        process_handwriting_conversion.run(str(sample_job.id))
+
+        assert seen_during_render == [True]
+        mock_dependencies["vlm"].assert_called_once_with(page_path, model_name=sample_job.model_used)
+
+    def test_task_commits_once_per_phase(self, mock_dependencies, sample_job, temp_dir):
+        """Test page rows share the PROCESSING_VLM commit and the TeX path shares the final status commit."""
+        import os
+
+        page_path = os.path.join(temp_dir, "page_0.jpg")
+        with open(page_path, "wb") as f:
+            f.write(b"jpeg-bytes")
+
+        def render(pdf_path, output_dir, on_page=None):
+            on_page(page_path)
+            return [page_path]
+
+        mock_db = mock_dependencies["db"]
+        mock_db.query.return_value.filter.return_value.first.return_value = sample_job
+        mock_dependencies["render"].side_effect = render
+        mock_dependencies["s3"].head_object.return_value = {"ContentLength": len(b"jpeg-bytes")}
+        committed = []
+        mock_db.commit.side_effect = lambda: committed.append((sample_job.status, sample_job.initial_tex_s3_path))
+
+        process_handwriting_conversion.run(str(sample_job.id))
+
+        mock_db.bulk_insert_mappings.assert_called_once()
+        assert [status for status, _ in committed[1:]] == [
+            models.JobStatus.RENDERING,
+            models.JobStatus.PROCESSING_VLM,
+            models.JobStatus.SEGMENTATION_COMPLETE,
+        ]
+        assert committed[-1][1] == "outputs/initial_tex/test.tex"
+
 
 class TestCompileFinalDocument:
     """Tests for compile_final_document task."""
@@ -159,13 +615,17 @@ class TestCompileFinalDocument:
         """Mock dependencies for compilation task."""
         with patch("api.tasks.SessionLocal") as mock_session, \
              patch("api.tasks.download_from_s3") as mock_download, \
+             patch("api.tasks.stream_from_s3") as mock_stream, \
              patch("api.tasks.upload_local_file_to_s3") as mock_upload, \
+             patch("api.tasks.upload_content_to_s3") as mock_upload_content, \
+             patch("api.tasks.copy_s3_object") as mock_copy, \
              patch("subprocess.run") as mock_subprocess, \
              patch.object(compile_final_document, "update_state") as mock_update:
             
             mock_db = MagicMock()
             mock_session.return_value = mock_db
             mock_download.return_value = b"\\documentclass{article}\\begin{document}Test\\end{document}"
+            mock_stream.side_effect = lambda key: iter([b"\\documentclass{article}\\begin{document}Test\\end{document}"])
             mock_upload.return_value = "outputs/final_tex/test.tex"
             
             mock_result = MagicMock()
@@ -178,7 +638,10 @@ class TestCompileFinalDocument:
                 "session": mock_session,
                 "db": mock_db,
                 "download": mock_download,
+                "stream": mock_stream,
                 "upload": mock_upload,
+                "upload_content": mock_upload_content,
+                "copy": mock_copy,
                 "subprocess": mock_subprocess,
                 "update_state": mock_update,
             }
@@ -191,6 +654,23 @@ class TestCompileFinalDocument:
         
         assert "not found" in result
 
+    def test_compile_releases_connection_before_external_work(self, mock_compile_dependencies, sample_job_with_tex):
+        """Test the task session keeps attributes after commit and commits before S3/latexmk work."""
+        sample_job_with_tex.status = models.JobStatus.COMPILATION_PENDING
+        mock_db = mock_compile_dependencies["db"]
+        mock_db.query.return_value.filter.return_value.first.return_value = sample_job_with_tex
+        mock_db.query.return_value.outerjoin.return_value.filter.return_value.all.return_value = []
+        
+        events = []
+        mock_db.commit.side_effect = lambda: events.append("commit")
+        mock_compile_dependencies["stream"].side_effect = lambda key: events.append("stream") or iter([b"tex"])
+        
+        with patch("os.path.exists", return_value=True):
+            compile_final_document.run(str(sample_job_with_tex.id))
+        
+        mock_compile_dependencies["session"].assert_called_once_with(expire_on_commit=False)
+        assert events.index("commit") < events.index("stream")
+
     def test_compile_missing_initial_tex(self, mock_compile_dependencies, sample_job):
         """Test compile task handles missing initial TeX."""
         sample_job.initial_tex_s3_path = None
@@ -204,7 +684,7 @@ class TestCompileFinalDocument:
         """Test compile task uses -no-shell-escape flag with latexmk."""
         sample_job_with_tex.status = models.JobStatus.COMPILATION_PENDING
         mock_compile_dependencies["db"].query.return_value.filter.return_value.first.return_value = sample_job_with_tex
-        mock_compile_dependencies["db"].query.return_value.filter.return_value.all.return_value = []
+        mock_compile_dependencies["db"].query.return_value.outerjoin.return_value.filter.return_value.all.return_value = []
         
         with patch("os.path.exists") as mock_exists:
             mock_exists.return_value = True
@@ -218,6 +698,37 @@ class TestCompileFinalDocument:
                 assert "-no-shell-escape" in cmd
 
 
+    def test_compile_without_segmentations_copies_initial_tex(self, mock_compile_dependencies, sample_job_with_tex, temp_dir):
+        """Test an unmodified TeX is copied server-side rather than re-uploaded."""
+        import os
+
+        sample_job_with_tex.status = models.JobStatus.COMPILATION_PENDING
+        mock_db = mock_compile_dependencies["db"]
+        mock_db.query.return_value.filter.return_value.first.return_value = sample_job_with_tex
+        mock_db.query.return_value.outerjoin.return_value.filter.return_value.all.return_value = []
+        mock_compile_dependencies["copy"].return_value = f"outputs/final_tex/{sample_job_with_tex.id}.tex"
+        mock_compile_dependencies["upload_content"].return_value = f"outputs/final_pdf/{sample_job_with_tex.id}.pdf"
+
+        def fake_latexmk(cmd, cwd, **kwargs):
+            with open(os.path.join(cwd, "final.pdf"), "wb") as f:
+                f.write(b"%PDF-1.4")
+            return mock_compile_dependencies["subprocess"].return_value
+
+        mock_compile_dependencies["subprocess"].side_effect = fake_latexmk
+
+        compile_final_document.run(str(sample_job_with_tex.id))
+
+        mock_compile_dependencies["copy"].assert_called_once_with(
+            sample_job_with_tex.initial_tex_s3_path, f"outputs/final_tex/{sample_job_with_tex.id}.tex"
+        )
+        mock_compile_dependencies["upload"].assert_not_called()
+        mock_compile_dependencies["upload_content"].assert_called_once_with(
+            b"%PDF-1.4", f"outputs/final_pdf/{sample_job_with_tex.id}.pdf", content_type="application/pdf"
+        )
+        assert sample_job_with_tex.final_pdf_etag == content_etag(b"%PDF-1.4")
+        assert sample_job_with_tex.status == models.JobStatus.COMPILATION_COMPLETE
+
+
 class TestCompileLatexPreview:
     """Tests for compile_latex_preview task."""
 
@@ -305,7 +816,7 @@ class TestTaskErrorHandling:
     def test_task_cleans_up_on_failure(self):
         """Test task cleans up S3 uploads on failure."""
         with patch("api.tasks.SessionLocal") as mock_session, \
-             patch("api.tasks.download_from_s3") as mock_download, \
+             patch("api.tasks.download_file_from_s3") as mock_download, \
              patch("api.tasks.s3_client") as mock_s3, \
              patch("api.tasks.S3_BUCKET_NAME", "test-bucket"), \
              patch.object(process_handwriting_conversion, "update_state"):
@@ -328,7 +839,7 @@ class TestTaskErrorHandling:
     def test_task_sets_error_message(self):
         """Test task sets error message on failure."""
         with patch("api.tasks.SessionLocal") as mock_session, \
-             patch("api.tasks.download_from_s3") as mock_download, \
+             patch("api.tasks.download_file_from_s3") as mock_download, \
              patch.object(process_handwriting_conversion, "update_state"):
             
             mock_db = MagicMock()
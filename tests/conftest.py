@@ -24,6 +24,7 @@ os.environ.setdefault("AWS_REGION", "us-east-1")
 os.environ.setdefault("CELERY_BROKER_URL", "memory://")
 os.environ.setdefault("CELERY_RESULT_BACKEND_URL", "memory://")
 os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RAISELOAD_ENABLED", "1")
 
 from api.database import Base, get_db
 from api.main import app
@@ -173,7 +174,8 @@ def sample_segmentations(db_session, sample_job_with_tex) -> list[models.Segment
 @pytest.fixture
 def mock_s3_client():
     """Mock boto3 S3 client."""
-    with patch("api.s3_utils.s3_client") as mock_client:
+    with patch("api.s3_utils.s3_client") as mock_client, \
+         patch.dict("api.s3_utils._presigned_url_cache", clear=True):
         mock_client.upload_fileobj = MagicMock(return_value=None)
         mock_client.upload_file = MagicMock(return_value=None)
         mock_client.get_object = MagicMock(return_value={
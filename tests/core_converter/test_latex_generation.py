@@ -47,6 +47,14 @@ Content
         assert result == full_doc
         assert result.count("\\documentclass") == 1
 
+    def test_does_not_wrap_full_document_after_whitespace(self):
+        """Test leading whitespace before \\documentclass still counts as a full document."""
+        from packages.core_converter.src.core_converter.latex_generation.generator import wrap_latex_fragment
+        
+        full_doc = "\n  \\documentclass{article}\n\\begin{document}\nContent\n\\end{document}"
+        
+        assert wrap_latex_fragment(full_doc) == full_doc
+
     def test_custom_preamble(self):
         """Test wrapping with custom preamble."""
         from packages.core_converter.src.core_converter.latex_generation.generator import wrap_latex_fragment
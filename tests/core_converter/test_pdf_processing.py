@@ -29,7 +29,7 @@ class TestRenderPdfPagesToImages:
             mock_pix = MagicMock()
             mock_pix.width = 100
             mock_pix.height = 100
-            mock_pix.samples = b"\x00" * (100 * 100 * 3)
+            mock_pix.samples_mv = b"\x00" * (100 * 100 * 3)
             mock_page.get_pixmap.return_value = mock_pix
             mock_doc.pages.return_value = [mock_page, mock_page]
             mock_fitz.open.return_value = mock_doc
@@ -40,6 +40,69 @@ class TestRenderPdfPagesToImages:
             mock_fitz.open.assert_called_once_with(pdf_path)
             mock_doc.close.assert_called_once()
 
+    def test_render_calls_on_page_per_saved_image(self, temp_dir, sample_pdf_content):
+        """Test on_page callback receives each image path as it is saved."""
+        from packages.core_converter.src.core_converter.pdf_processing.processor import render_pdf_pages_to_images
+        
+        pdf_path = os.path.join(temp_dir, "test.pdf")
+        output_dir = os.path.join(temp_dir, "output")
+        
+        with open(pdf_path, "wb") as f:
+            f.write(sample_pdf_content)
+        
+        with patch("packages.core_converter.src.core_converter.pdf_processing.processor.fitz") as mock_fitz:
+            mock_doc = MagicMock()
+            mock_doc.page_count = 2
+            mock_page = MagicMock()
+            mock_pix = MagicMock()
+            mock_pix.width = 10
+            mock_pix.height = 10
+            mock_pix.samples_mv = b"\x00" * (10 * 10 * 3)
+            mock_page.get_pixmap.return_value = mock_pix
+            mock_doc.pages.return_value = [mock_page, mock_page]
+            mock_fitz.open.return_value = mock_doc
+            
+            seen = []
+            result = render_pdf_pages_to_images(pdf_path, output_dir, on_page=lambda path: seen.append((path, os.path.exists(path))))
+            
+            assert seen == [(path, True) for path in result]
+
+    def test_render_in_process_pool_keeps_page_order(self, temp_dir):
+        """Test pages rendered across worker processes are all reported and returned in page order."""
+        import fitz
+        from packages.core_converter.src.core_converter.pdf_processing.processor import render_pdf_pages_to_images
+        
+        pdf_path = os.path.join(temp_dir, "test.pdf")
+        output_dir = os.path.join(temp_dir, "output")
+        with fitz.open() as doc:
+            for _ in range(3):
+                doc.new_page(width=100, height=100)
+            doc.save(pdf_path)
+        
+        seen = []
+        result = render_pdf_pages_to_images(pdf_path, output_dir, dpi=36, on_page=seen.append, workers=2)
+        
+        assert result == [os.path.join(output_dir, f"page_{i}.jpg") for i in range(3)]
+        assert sorted(seen) == result
+        assert all(os.path.exists(path) for path in result)
+
+    def test_render_selected_pages_only(self, temp_dir):
+        """Test page_indices limits rendering to the requested pages, in the given order."""
+        import fitz
+        from packages.core_converter.src.core_converter.pdf_processing.processor import render_pdf_pages_to_images
+        
+        pdf_path = os.path.join(temp_dir, "test.pdf")
+        output_dir = os.path.join(temp_dir, "output")
+        with fitz.open() as doc:
+            for _ in range(3):
+                doc.new_page(width=100, height=100)
+            doc.save(pdf_path)
+        
+        result = render_pdf_pages_to_images(pdf_path, output_dir, dpi=36, page_indices=[2, 0])
+        
+        assert result == [os.path.join(output_dir, "page_2.jpg"), os.path.join(output_dir, "page_0.jpg")]
+        assert sorted(os.listdir(output_dir)) == ["page_0.jpg", "page_2.jpg"]
+
     def test_render_file_not_found(self, temp_dir):
         """Test handling of file not found."""
         from packages.core_converter.src.core_converter.pdf_processing.processor import render_pdf_pages_to_images
@@ -66,6 +129,8 @@ class TestRenderPdfPagesToImages:
             result = render_pdf_pages_to_images(pdf_path, output_dir)
             
             assert result == []
+            mock_doc.close.assert_called_once()
+            mock_fitz.TOOLS.store_shrink.assert_called_once_with(100)
 
     def test_render_creates_output_dir(self, temp_dir, sample_pdf_content):
         """Test that output directory is created if it doesn't exist."""
@@ -84,7 +149,7 @@ class TestRenderPdfPagesToImages:
             mock_pix = MagicMock()
             mock_pix.width = 100
             mock_pix.height = 100
-            mock_pix.samples = b"\x00" * (100 * 100 * 3)
+            mock_pix.samples_mv = b"\x00" * (100 * 100 * 3)
             mock_page.get_pixmap.return_value = mock_pix
             mock_doc.pages.return_value = [mock_page]
             mock_fitz.open.return_value = mock_doc
@@ -110,7 +175,7 @@ class TestRenderPdfPagesToImages:
             mock_pix = MagicMock()
             mock_pix.width = 100
             mock_pix.height = 100
-            mock_pix.samples = b"\x00" * (100 * 100 * 3)
+            mock_pix.samples_mv = b"\x00" * (100 * 100 * 3)
             mock_page.get_pixmap.return_value = mock_pix
             mock_doc.pages.return_value = [mock_page]
             mock_fitz.open.return_value = mock_doc
@@ -151,12 +216,13 @@ class TestRenderPdfToImage:
             f.write(sample_pdf_content)
         
         with patch("packages.core_converter.src.core_converter.pdf_processing.processor.render_pdf_pages_to_images") as mock_render:
-            mock_render.return_value = [os.path.join(temp_dir, "page_0.png")]
+            mock_render.return_value = [os.path.join(temp_dir, "page_0.jpg")]
             
             with patch("os.path.join") as mock_join:
-                mock_join.return_value = os.path.join(temp_dir, "page_0.png")
+                mock_join.return_value = os.path.join(temp_dir, "page_0.jpg")
                 
                 with patch("os.rename"):
                     render_pdf_to_image(pdf_path, output_path)
                     
                     mock_render.assert_called_once()
+                    assert mock_render.call_args.kwargs["page_indices"] == [0]
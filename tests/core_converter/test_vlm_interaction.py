@@ -8,6 +8,18 @@ from unittest.mock import patch, MagicMock
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def clear_api_client_caches():
+    """Reset the shared client and encoded-image caches so each test sees its own mocks."""
+    from packages.core_converter.src.core_converter.vlm_interaction import api_client
+
+    api_client._get_client.cache_clear()
+    api_client._encode_image.cache_clear()
+    yield
+    api_client._get_client.cache_clear()
+    api_client._encode_image.cache_clear()
+
+
 class TestGetLatexFromImage:
     """Tests for get_latex_from_image function."""
 
@@ -74,7 +86,7 @@ Description: A test diagram.
 """
         
         with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
-            with patch("packages.core_converter.src.core_converter.vlm_interaction.api_client.OpenAI") as mock_openai:
+            with patch("openai.OpenAI") as mock_openai:
                 mock_client = MagicMock()
                 mock_client.chat.completions.create.return_value = mock_response
                 mock_openai.return_value = mock_client
@@ -98,7 +110,7 @@ Description: A test diagram.
         mock_response.choices[0].message.content = f"```latex\n{latex_content}\n```\n"
         
         with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
-            with patch("packages.core_converter.src.core_converter.vlm_interaction.api_client.OpenAI") as mock_openai:
+            with patch("openai.OpenAI") as mock_openai:
                 mock_client = MagicMock()
                 mock_client.chat.completions.create.return_value = mock_response
                 mock_openai.return_value = mock_client
@@ -122,7 +134,7 @@ Description: A test diagram.
         mock_response.choices[0].message.content = "No LaTeX block here"
         
         with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
-            with patch("packages.core_converter.src.core_converter.vlm_interaction.api_client.OpenAI") as mock_openai:
+            with patch("openai.OpenAI") as mock_openai:
                 mock_client = MagicMock()
                 mock_client.chat.completions.create.return_value = mock_response
                 mock_openai.return_value = mock_client
@@ -142,7 +154,7 @@ Description: A test diagram.
             f.write(sample_image_bytes)
         
         with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
-            with patch("packages.core_converter.src.core_converter.vlm_interaction.api_client.OpenAI") as mock_openai:
+            with patch("openai.OpenAI") as mock_openai:
                 mock_client = MagicMock()
                 mock_client.chat.completions.create.side_effect = Exception("API Error")
                 mock_openai.return_value = mock_client
@@ -165,7 +177,7 @@ Description: A test diagram.
         mock_response.choices[0].message.content = "```latex\n\\documentclass{article}\\end{document}\n```"
         
         with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
-            with patch("packages.core_converter.src.core_converter.vlm_interaction.api_client.OpenAI") as mock_openai:
+            with patch("openai.OpenAI") as mock_openai:
                 mock_client = MagicMock()
                 mock_client.chat.completions.create.return_value = mock_response
                 mock_openai.return_value = mock_client
@@ -175,6 +187,79 @@ Description: A test diagram.
                 call_args = mock_client.chat.completions.create.call_args
                 assert call_args[1]["model"] == "gpt-4o"
 
+    def test_sends_jpeg_pages_with_jpeg_mime_type(self, temp_dir, sample_image_bytes):
+        """Test rendered JPEG pages are sent as image/jpeg data URLs."""
+        from packages.core_converter.src.core_converter.vlm_interaction.api_client import get_latex_from_image
+        
+        image_path = os.path.join(temp_dir, "page_0.jpg")
+        with open(image_path, "wb") as f:
+            f.write(sample_image_bytes)
+        
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = "```latex\n\\documentclass{article}\\end{document}\n```"
+        
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
+            with patch("openai.OpenAI") as mock_openai:
+                mock_client = MagicMock()
+                mock_client.chat.completions.create.return_value = mock_response
+                mock_openai.return_value = mock_client
+                
+                get_latex_from_image(image_path, model_name="gpt-4o")
+                
+                messages = mock_client.chat.completions.create.call_args[1]["messages"]
+                assert "data:image/jpeg;base64," in str(messages)
+
+
+    def test_reuses_client_and_encoded_image_across_models(self, temp_dir, sample_image_bytes):
+        """Test a second model call builds no new client and does not re-read the image."""
+        from packages.core_converter.src.core_converter.vlm_interaction.api_client import get_latex_from_image
+        
+        image_path = os.path.join(temp_dir, "test.png")
+        with open(image_path, "wb") as f:
+            f.write(sample_image_bytes)
+        
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = "```latex\n\\documentclass{article}\\end{document}\n```"
+        
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
+            with patch("openai.OpenAI") as mock_openai, \
+                 patch("builtins.open", wraps=open) as mock_open:
+                mock_openai.return_value.chat.completions.create.return_value = mock_response
+                
+                get_latex_from_image(image_path, model_name="gpt-4o")
+                get_latex_from_image(image_path, model_name="o4-mini")
+                
+                mock_openai.assert_called_once_with(api_key="test-key")
+                assert mock_open.call_count == 1
+                assert mock_openai.return_value.chat.completions.create.call_count == 2
+
+class TestEncodeImage:
+    """Tests for _encode_image function."""
+
+    def test_matches_base64_of_file(self, temp_dir, sample_image_bytes):
+        """Test the mapped-file encoding equals encoding the file's bytes."""
+        import base64
+        from packages.core_converter.src.core_converter.vlm_interaction.api_client import _encode_image
+        
+        image_path = os.path.join(temp_dir, "test.png")
+        with open(image_path, "wb") as f:
+            f.write(sample_image_bytes)
+        
+        result = _encode_image(image_path, os.path.getmtime(image_path), len(sample_image_bytes))
+        
+        assert result == base64.b64encode(sample_image_bytes).decode("ascii")
+
+    def test_empty_file(self, temp_dir):
+        """Test an empty file encodes to an empty string instead of failing to map."""
+        from packages.core_converter.src.core_converter.vlm_interaction.api_client import _encode_image
+        
+        image_path = os.path.join(temp_dir, "empty.png")
+        open(image_path, "wb").close()
+        
+        assert _encode_image(image_path, os.path.getmtime(image_path), 0) == ""
+
 
 class TestDummyLatexOutput:
     """Tests for DUMMY_LATEX_OUTPUT constant."""